@@ -0,0 +1,78 @@
+# Micro-benchmarks en proceso (sin red ni gunicorn: miden el coste del handler)
+#   flask bench-validate --requests 2000
+#   flask bench-hash --methods pbkdf2:sha256:600000,scrypt:32768:8:1 --cpus 0.5
+import time
+
+import click
+from flask_jwt_extended import create_access_token
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from passwords import normalize_method
+
+BENCH_HASH_METHODS = (
+    'pbkdf2:sha256:260000',
+    'pbkdf2:sha256:600000',
+    'scrypt:16384:8:1',
+    'scrypt:32768:8:1',
+)
+
+
+def _measure(client, path, headers, count):
+    """Peticiones/s y latencia media (ms) de `count` GET secuenciales"""
+    started = time.perf_counter()
+    for _ in range(count):
+        response = client.get(path, headers=headers)
+        if response.status_code != 200:
+            raise click.ClickException(f'{path} returned {response.status_code}')
+    elapsed = time.perf_counter() - started
+    return count / elapsed, elapsed / count * 1000
+
+
+def _hashes_per_second(method, seconds):
+    """Verificaciones por segundo en un solo hilo (= por núcleo); coste de un login"""
+    stored = generate_password_hash('bench-password', method)
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        check_password_hash(stored, 'bench-password')
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def register_commands(app, db, User, user_cache):
+    @app.cli.command('bench-validate')
+    @click.option('--requests', 'count', default=2000, help='Peticiones por escenario')
+    @click.option('--user-id', type=int, help='Usuario del token (por defecto el primero)')
+    def bench_validate_command(count, user_id):
+        """Peticiones/s de /validate con y sin la caché de usuarios"""
+        user = db.session.get(User, user_id) if user_id else User.query.order_by(User.id).first()
+        if not user:
+            raise click.ClickException('No users to benchmark with')
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+        db.session.remove()
+
+        client = app.test_client()
+        enabled = user_cache.enabled
+        try:
+            for label, cached in (('without cache', False), ('with cache', True)):
+                user_cache.enabled = cached
+                user_cache.clear()
+                rps, avg_ms = _measure(client, '/validate', headers, count)
+                print(f"/validate {label}: {rps:.0f} req/s ({avg_ms:.3f} ms/req)")
+        finally:
+            user_cache.enabled = enabled
+
+    @app.cli.command('bench-hash')
+    @click.option('--methods', default=None, help='Métodos separados por comas (por defecto varios costes)')
+    @click.option('--seconds', default=2.0, help='Duración de la medición por método')
+    @click.option('--cpus', default=0.5, help='CPU del pod para estimar logins/s')
+    def bench_hash_command(methods, seconds, cpus):
+        """Hashes/s por núcleo de cada método, para elegir PASSWORD_HASH_METHOD"""
+        methods = methods.split(',') if methods else BENCH_HASH_METHODS
+        configured = normalize_method(app.config['PASSWORD_HASH_METHOD'])
+        for method in methods:
+            method = normalize_method(method.strip())
+            rate = _hashes_per_second(method, seconds)
+            marker = ' (configured)' if method == configured else ''
+            print(f"{method}{marker}: {rate:.1f} hashes/s per core, "
+                  f"{1000 / rate:.1f} ms/hash, ~{rate * cpus:.1f} logins/s at {cpus} CPU")
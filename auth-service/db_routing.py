@@ -0,0 +1,257 @@
+# Enrutado de lecturas a réplicas de la base de datos.
+#   DATABASE_REPLICA_URIS=uri1,uri2   réplicas de solo lectura (binds replica_0, replica_1...)
+#   REPLICA_MAX_LAG_SECONDS=5         una réplica más retrasada no se usa
+#   REPLICA_STICKY_SECONDS=5          tras escribir, ese cliente (y ese usuario) lee del primario
+#   REPLICA_LAG_CHECK_SECONDS=1       cada cuánto se mide el retraso
+# Solo las vistas marcadas con @db_router.read_only leen de una réplica (por
+# turnos); cualquier escritura, flush o SELECT ... FOR UPDATE va al primario.
+# El retraso se mide con una fila de latido que se actualiza en el primario y
+# se lee en cada réplica, así que funciona igual con MySQL que con dos
+# ficheros SQLite copiados a mano.
+# La lectura de lo propio escrito se reconoce por la cookie db_last_write, por
+# la cabecera X-DB-Last-Write que el cliente puede reenviar (clientes sin
+# cookies) y por el usuario autenticado, cuya última escritura se guarda en el
+# almacén compartido (ver shared_store.py) para verla desde otro dispositivo,
+# worker o réplica.
+import functools
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, event, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA_KEY = 'replica_engine'
+# Instante de la última escritura del cliente (lectura de lo propio escrito)
+LAST_WRITE_COOKIE = 'db_last_write'
+LAST_WRITE_HEADER = 'X-DB-Last-Write'
+
+HEARTBEAT = Table(
+    'replica_heartbeat', MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('beat_at', DateTime, nullable=False),
+)
+
+
+def create_heartbeat_table(engine):
+    """Crear la tabla de latido con su única fila (migración)"""
+    HEARTBEAT.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        if conn.execute(select(HEARTBEAT.c.id)).first() is None:
+            conn.execute(insert(HEARTBEAT).values(id=1, beat_at=datetime.utcnow()))
+
+
+class RoutingSession(Session):
+    """Sesión que usa la réplica elegida para la petición en las lecturas"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get(REPLICA_KEY)
+        if (
+            replica is not None and bind is None and not self._flushing
+            and not isinstance(clause, UpdateBase)
+            and getattr(clause, '_for_update_arg', None) is None
+        ):
+            return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is None or not (context.isinsert or context.isupdate or context.isdelete):
+        return
+    if context.execution_options.get('replica_heartbeat'):
+        return
+    if has_request_context():
+        g.db_wrote = True
+
+
+class ReplicaState:
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.lag_seconds = None
+        self.checked_at = 0.0
+        self.error = None
+
+    def snapshot(self):
+        return {
+            'lag_seconds': round(self.lag_seconds, 3) if self.lag_seconds is not None else None,
+            'error': self.error,
+        }
+
+
+class ReplicaRouter:
+    def __init__(self, db, max_lag=5.0, sticky_seconds=5.0, check_interval=1.0, store=None):
+        self.db = db
+        self.max_lag = max_lag
+        self.sticky_seconds = sticky_seconds
+        self.check_interval = check_interval
+        self.store = store
+        self.replicas = []
+        self.routed = {'replica': 0, 'primary_sticky': 0, 'primary_lag': 0, 'primary_no_replica': 0}
+        self._load_user = None
+        self._turn = itertools.count()
+        self._check_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        with app.app_context():
+            self.replicas = [
+                ReplicaState(key, engine)
+                for key, engine in self.db.engines.items()
+                if key is not None and key.startswith('replica_')
+            ]
+        if not event.contains(Engine, 'after_cursor_execute', _after_cursor_execute):
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def user_loader(self, callback):
+        """Registrar la función que devuelve el id del usuario autenticado de la
+        petición (o None); sin ella la lectura de lo propio va solo por cliente"""
+        self._load_user = callback
+        return callback
+
+    # ============ Elección de la base de datos ============
+
+    def _current_user(self):
+        if 'db_user_id' not in g:
+            try:
+                g.db_user_id = self._load_user() if self._load_user else None
+            except Exception:
+                g.db_user_id = None
+        return g.db_user_id
+
+    @staticmethod
+    def _user_key(user_id):
+        return f'last_write:user:{user_id}'
+
+    def _last_write(self):
+        """Última escritura conocida del cliente o de su usuario (epoch), 0 si ninguna"""
+        stamps = [request.headers.get(LAST_WRITE_HEADER), request.cookies.get(LAST_WRITE_COOKIE)]
+        user_id = self._current_user() if self.store is not None else None
+        if user_id is not None:
+            try:
+                stamps.append(self.store.get(self._user_key(user_id)))
+            except Exception as e:
+                # Sin el almacén compartido queda la cookie/cabecera del cliente
+                print(f"Replica routing: last write lookup failed: {e}")
+        last_write = 0.0
+        for stamp in stamps:
+            try:
+                last_write = max(last_write, float(stamp or 0))
+            except ValueError:
+                pass
+        return last_write
+
+    def _sticky(self):
+        return time.time() - self._last_write() < self.sticky_seconds
+
+    def _measure_lag(self, state):
+        """Escribir el latido en el primario (como mucho uno por intervalo) y leerlo en la réplica"""
+        now = datetime.utcnow()
+        try:
+            with self.db.engine.begin() as conn:
+                conn.execute(
+                    update(HEARTBEAT)
+                    .where(HEARTBEAT.c.id == 1, HEARTBEAT.c.beat_at < now - timedelta(seconds=self.check_interval))
+                    .values(beat_at=now)
+                    .execution_options(replica_heartbeat=True)
+                )
+            with state.engine.connect() as conn:
+                beat_at = conn.execute(select(HEARTBEAT.c.beat_at).where(HEARTBEAT.c.id == 1)).scalar()
+        except Exception as e:
+            print(f"Replica {state.name}: lag check failed: {e}")
+            state.lag_seconds, state.error = None, str(e)
+            return
+        # El latido puede tener hasta un intervalo de antigüedad sin que haya retraso
+        state.lag_seconds = max((now - beat_at).total_seconds() - self.check_interval, 0.0) if beat_at else None
+        state.error = None if beat_at else 'no heartbeat row'
+
+    def _refresh(self):
+        now = time.monotonic()
+        stale = [s for s in self.replicas if now - s.checked_at >= self.check_interval]
+        # Un solo hilo mide; el resto usa el último valor
+        if not stale or not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            for state in stale:
+                state.checked_at = now
+                self._measure_lag(state)
+        finally:
+            self._check_lock.release()
+
+    def choose(self):
+        """Engine de réplica para esta petición, o None para usar el primario"""
+        if not self.replicas:
+            return self._count('primary_no_replica')
+        if self._sticky():
+            return self._count('primary_sticky')
+        self._refresh()
+        usable = [s for s in self.replicas if s.lag_seconds is not None and s.lag_seconds <= self.max_lag]
+        if not usable:
+            return self._count('primary_lag')
+        self._count('replica')
+        return usable[next(self._turn) % len(usable)].engine
+
+    def _count(self, outcome):
+        with self._lock:
+            self.routed[outcome] += 1
+        return None
+
+    def read_only(self, view):
+        """Decorador para vistas que solo leen"""
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            replica = self.choose()
+            if replica is not None:
+                # Hasta el final de la petición (también si la respuesta es en streaming)
+                self.db.session.info[REPLICA_KEY] = replica
+                g.db_replica = True
+            return view(*args, **kwargs)
+        return wrapper
+
+    def _after_request(self, response):
+        if g.get('db_wrote'):
+            stamp = f'{time.time():.3f}'
+            response.set_cookie(
+                LAST_WRITE_COOKIE, stamp, max_age=max(int(self.sticky_seconds), 1),
+                httponly=True, samesite='Lax'
+            )
+            response.headers[LAST_WRITE_HEADER] = stamp
+            user_id = self._current_user() if self.replicas and self.store is not None else None
+            if user_id is not None:
+                try:
+                    self.store.set(self._user_key(user_id), stamp, self.sticky_seconds)
+                except Exception as e:
+                    print(f"Replica routing: last write record failed: {e}")
+        if g.get('db_replica'):
+            response.headers['X-DB-Route'] = 'replica'
+        return response
+
+    def _teardown_request(self, exc):
+        if g.pop('db_replica', False):
+            self.db.session.info.pop(REPLICA_KEY, None)
+
+    def stats(self):
+        with self._lock:
+            routed = dict(self.routed)
+        return {
+            'replicas': {s.name: s.snapshot() for s in self.replicas},
+            'max_lag_seconds': self.max_lag,
+            'sticky_seconds': self.sticky_seconds,
+            'routed': routed,
+        }
+
+
+def router_from_config(db, config, store=None):
+    return ReplicaRouter(
+        db,
+        max_lag=config['REPLICA_MAX_LAG_SECONDS'],
+        sticky_seconds=config['REPLICA_STICKY_SECONDS'],
+        check_interval=config['REPLICA_LAG_CHECK_SECONDS'],
+        store=store,
+    )
@@ -0,0 +1,99 @@
+# Proveedor JSON de la app: orjson (codificador en C) si está instalado y la
+# librería estándar si no. En ambos casos las fechas se escriben en ISO 8601,
+# así que los listados pueden serializar filas de columnas (tuplas de la
+# consulta) directamente, sin hidratar objetos ni llamar a to_dict().
+#   flask bench-json --rows 1000    coste de serializar 1k filas por modelo
+import json
+import time
+from datetime import date, datetime
+
+import click
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return DefaultJSONProvider.default(value)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Compatible con jsonify; `dumps_bytes` evita decodificar y volver a codificar"""
+
+    backend = 'orjson' if orjson is not None else 'json'
+
+    def dumps_bytes(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            option = orjson.OPT_NON_STR_KEYS
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            return orjson.dumps(obj, default=_default, option=option)
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        kwargs.setdefault('separators', (',', ':'))
+        return json.dumps(obj, **kwargs).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj, **kwargs).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
+
+
+def model_columns(model):
+    """Columnas de API_FIELDS, para consultar tuplas en lugar de objetos"""
+    return [getattr(model, name) for name in model.API_FIELDS]
+
+
+def rows_to_dicts(fields, rows):
+    return [dict(zip(fields, row)) for row in rows]
+
+
+# ============ Benchmark ============
+
+def _best_ms(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def register_commands(app, samples):
+    """`samples`: {nombre: (Modelo, valores de ejemplo)} de los modelos a medir"""
+
+    @app.cli.command('bench-json')
+    @click.option('--rows', default=1000, help='Filas por modelo')
+    @click.option('--repeat', default=5, help='Repeticiones (se toma la mejor)')
+    def bench_json_command(rows, repeat):
+        """ms por 1k filas: to_dict + json estándar, to_dict + proveedor y tuplas + proveedor"""
+        stdlib = DefaultJSONProvider(app)
+        provider = app.json
+        print(f"JSON backend: {getattr(provider, 'backend', type(provider).__name__)}")
+
+        for name, (model, values) in samples.items():
+            objects = [model(id=i, **values) for i in range(1, rows + 1)]
+            fields = model.API_FIELDS
+            tuples = [tuple(getattr(obj, field) for field in fields) for obj in objects]
+
+            scenarios = (
+                ('to_dict + stdlib jsonify', lambda: stdlib.dumps([obj.to_dict() for obj in objects])),
+                ('to_dict + provider', lambda: provider.dumps_bytes([obj.to_dict() for obj in objects])),
+                ('row tuples + provider', lambda: provider.dumps_bytes(rows_to_dicts(fields, tuples))),
+            )
+            for label, func in scenarios:
+                per_1k = _best_ms(func, repeat) * 1000 / rows
+                print(f"{name:<10} {label:<26} {per_1k:8.3f} ms / 1k rows")
@@ -0,0 +1,91 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Valores por defecto de Werkzeug 3 para completar métodos abreviados
+PBKDF2_DEFAULT_ITERATIONS = 600000
+SCRYPT_DEFAULTS = (2 ** 15, 8, 1)
+
+
+def normalize_method(method):
+    """Método en la forma en que Werkzeug lo guarda en el hash ('pbkdf2:sha256:600000')"""
+    parts = method.split(':')
+    if parts[0] == 'pbkdf2':
+        hash_name = parts[1] if len(parts) > 1 else 'sha256'
+        iterations = int(parts[2]) if len(parts) > 2 else PBKDF2_DEFAULT_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    if parts[0] == 'scrypt':
+        n, r, p = (int(v) for v in parts[1:4]) if len(parts) > 3 else SCRYPT_DEFAULTS
+        return f'scrypt:{n}:{r}:{p}'
+    raise ValueError(f'Unsupported password hash method: {method}')
+
+
+class HasherBusy(Exception):
+    """Demasiadas operaciones de hash en espera; la petición debe reintentarse"""
+
+
+class PasswordHasher:
+    """Hash y verificación de contraseñas en un pool acotado.
+
+    Como mucho `workers` hashes corren a la vez y `max_pending` esperan
+    turno; por encima se rechaza con HasherBusy. Así un pico de logins no
+    ocupa toda la CPU del pod ni todos los hilos de gunicorn. Con
+    executor='process' el hash corre fuera del GIL del worker. El pool se
+    crea en el primer uso, ya dentro de cada worker (también con GUNICORN_PRELOAD=1).
+    """
+
+    def __init__(self, method, workers=1, executor='thread', max_pending=16):
+        self.method = normalize_method(method)
+        self.workers = workers
+        self.executor_kind = executor
+        self.max_pending = max_pending
+        self.rejected = 0
+        self.rehashed = 0
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.executor_kind == 'process':
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='hasher')
+            return self._executor
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HasherBusy()
+        try:
+            return self._get_executor().submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        return self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        """True si el hash se generó con otro método o coste que el configurado"""
+        return stored_hash.split('$', 1)[0] != self.method
+
+    def record_rehash(self):
+        with self._lock:
+            self.rehashed += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'method': self.method,
+                'executor': self.executor_kind,
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'rejected': self.rejected,
+                'rehashed': self.rehashed
+            }
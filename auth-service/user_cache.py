@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+
+from shared_store import Broadcast, LocalStore
+
+
+class TTLCache:
+    """Caché LRU acotada con expiración por entrada (thread-safe)"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+            return item[0] if item else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class UserCache:
+    """Proyecciones `User.to_dict()` por id, en memoria del proceso.
+
+    Solo se guardan usuarios existentes. Cada cambio confirmado invalida su
+    entrada en este worker al momento y en el resto (a través de `store`,
+    ver shared_store.py) en su siguiente consulta, como mucho un segundo
+    después; sin almacén compartido, en los demás al caducar por `ttl`.
+    """
+
+    def __init__(self, maxsize=10000, ttl=30, enabled=True, store=None):
+        self.enabled = enabled and ttl > 0
+        self.hits = 0
+        self.misses = 0
+        self._cache = TTLCache(maxsize, ttl)
+        self._lock = threading.Lock()
+        self._invalidations = Broadcast(store or LocalStore(), 'user-invalidations',
+                                        lambda message: self._cache.pop(message['user_id']))
+
+    def _count(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def get(self, user_id):
+        self._invalidations.poll()
+        user = self._cache.get(user_id) if self.enabled else None
+        self._count(int(user is not None), int(user is None))
+        return user
+
+    def get_many(self, user_ids):
+        """Devuelve ({id: usuario} de los cacheados, [ids que faltan])"""
+        found = {}
+        self._invalidations.poll()
+        if self.enabled:
+            for user_id in user_ids:
+                user = self._cache.get(user_id)
+                if user is not None:
+                    found[user_id] = user
+        missing = [user_id for user_id in user_ids if user_id not in found]
+        self._count(len(found), len(missing))
+        return found, missing
+
+    def set(self, user):
+        if self.enabled:
+            self._cache.set(user['id'], user)
+
+    def invalidate(self, user_id):
+        self._invalidations.publish({'user_id': user_id})
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'enabled': self.enabled,
+            'size': len(self._cache),
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+            'invalidations': self._invalidations.stats()
+        }
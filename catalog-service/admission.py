@@ -0,0 +1,311 @@
+# Control de admisión: límites de peticiones simultáneas por clase de ruta
+# que se adaptan a la latencia observada (AIMD) y rechazo inmediato con 503 +
+# Retry-After cuando el servicio está saturado, en vez de dejar que las
+# peticiones se acumulen hasta bloquear todos los hilos (y las sondas).
+#   ADMISSION_CAPACITY          peticiones simultáneas por worker (por defecto los hilos de gunicorn)
+#   ADMISSION_READ_TARGET_MS    latencia objetivo de las lecturas (250)
+#   ADMISSION_WRITE_TARGET_MS   latencia objetivo de las escrituras (1000)
+#   ADMISSION_WRITE_SHARE       fracción de la capacidad que pueden ocupar las escrituras (0.75)
+# Las sondas y /metrics nunca se rechazan y siempre queda un hueco libre para
+# ellas; las lecturas pueden usar toda la capacidad restante.
+# También incluye cubos de tokens por clave (usuario, email) para /login y
+# /purchase, guardados en el almacén compartido (ver shared_store.py) para que
+# el límite sea el mismo con cualquier número de workers y réplicas.
+#   flask bench-admission   p99 con y sin control de admisión bajo sobrecarga
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from flask import Flask, g, jsonify, request
+
+from shared_store import LocalStore
+
+# Rutas que no se limitan nunca (sondas de Kubernetes y métricas)
+EXEMPT_ENDPOINTS = {'health_check', 'health_live', 'health_ready', 'metrics', 'admission_stats'}
+# Hilos reservados para las rutas exentas
+HEALTH_RESERVE = 1
+READ_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+class Limit:
+    """Límite AIMD de una clase: sube de uno en uno mientras la latencia está por
+    debajo del objetivo y se multiplica por `backoff` cuando lo supera o hay errores"""
+
+    def __init__(self, name, maximum, target, minimum=1, backoff=0.9):
+        self.name = name
+        self.maximum = maximum
+        self.minimum = minimum
+        self.target = target
+        self.backoff = backoff
+        self.limit = float(maximum)
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._last_decrease = 0.0
+
+    def available(self):
+        return self.in_flight < max(self.minimum, int(self.limit))
+
+    def on_complete(self, rtt, failed):
+        in_use = self.in_flight
+        self.in_flight -= 1
+        if failed or rtt > self.target:
+            now = time.monotonic()
+            # Como mucho una bajada por ventana: las peticiones lentas llegan a la vez
+            if now - self._last_decrease >= min(self.target, 1.0):
+                self.limit = max(self.minimum, self.limit * self.backoff)
+                self._last_decrease = now
+        elif in_use >= self.limit / 2:
+            # Solo crece si el límite se está usando de verdad
+            self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+
+    def snapshot(self):
+        return {
+            'limit': round(self.limit, 2),
+            'max': self.maximum,
+            'in_flight': self.in_flight,
+            'target_ms': round(self.target * 1000),
+            'admitted': self.admitted,
+            'rejected': self.rejected
+        }
+
+
+class TokenBucket:
+    """`rate` peticiones por segundo por clave, con ráfagas de hasta `burst`.
+    Sin almacén compartido el cubo es del proceso (límite por worker)"""
+
+    def __init__(self, name, rate, burst, store=None):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.store = store or LocalStore()
+        self.rejected = 0
+        self.errors = 0
+
+    def acquire(self, key):
+        """0 si se admite; si no, segundos hasta que haya un token"""
+        try:
+            wait = self.store.take(f'bucket:{self.name}:{key}', self.rate, self.burst)
+        except Exception as e:
+            # Almacén caído: se admite (el control de admisión sigue protegiendo el worker)
+            self.errors += 1
+            print(f"Rate limit {self.name}: store unavailable: {e}")
+            return 0.0
+        if wait:
+            self.rejected += 1
+        return wait
+
+    def snapshot(self):
+        return {'rate_per_minute': self.rate * 60, 'burst': self.burst, 'shared': self.store.shared,
+                'rejected': self.rejected, 'store_errors': self.errors}
+
+
+def _retry_after_header(seconds):
+    return str(max(1, int(seconds + 0.999)))
+
+
+def rate_limited(retry_after):
+    """Respuesta 429 de un cubo de tokens agotado"""
+    response = jsonify({'error': 'Too many requests'})
+    response.headers['Retry-After'] = _retry_after_header(retry_after)
+    return response, 429
+
+
+class Admission:
+    def __init__(self, capacity, read_target, write_target, write_share=0.75,
+                 bulk_target=30.0, bulk_share=0.25, retry_after=1, enabled=True):
+        self.capacity = capacity
+        self.enabled = enabled
+        self.retry_after = retry_after
+        self.total_limit = max(capacity - HEALTH_RESERVE, 1)
+        self.limits = {
+            'read': Limit('read', self.total_limit, read_target),
+            'write': Limit('write', max(1, int(self.total_limit * write_share)), write_target),
+            'bulk': Limit('bulk', max(1, int(self.total_limit * bulk_share)), bulk_target),
+        }
+        self.buckets = {}
+        self.in_flight = 0
+        self._classes = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, name, per_minute, burst, store=None):
+        self.buckets[name] = TokenBucket(name, per_minute / 60, burst, store)
+        return self.buckets[name]
+
+    def try_acquire(self, name):
+        with self._lock:
+            limit = self.limits[name]
+            if self.in_flight >= self.total_limit or not limit.available():
+                limit.rejected += 1
+                return False
+            self.in_flight += 1
+            limit.in_flight += 1
+            limit.admitted += 1
+            return True
+
+    def release(self, name, rtt, failed):
+        with self._lock:
+            self.in_flight -= 1
+            self.limits[name].on_complete(rtt, failed)
+
+    # ============ Hooks de Flask ============
+
+    def _route_class(self):
+        endpoint = request.endpoint
+        if endpoint is None or endpoint in EXEMPT_ENDPOINTS:
+            return None
+        return self._classes.get(endpoint) or ('read' if request.method in READ_METHODS else 'write')
+
+    def _before_request(self):
+        if not self.enabled:
+            return None
+        name = self._route_class()
+        if name is None:
+            return None
+        if not self.try_acquire(name):
+            response = jsonify({'error': 'Service overloaded, retry later'})
+            response.headers['Retry-After'] = _retry_after_header(self.retry_after)
+            return response, 503
+        g.admission = (name, time.perf_counter())
+        return None
+
+    def _after_request(self, response):
+        if 'admission' in g:
+            g.admission_status = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        admitted = g.pop('admission', None)
+        if admitted is None:
+            return
+        name, started = admitted
+        failed = exc is not None or g.get('admission_status', 500) >= 500
+        self.release(name, time.perf_counter() - started, failed)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'capacity': self.capacity,
+                'in_flight': self.in_flight,
+                'classes': {name: limit.snapshot() for name, limit in self.limits.items()},
+                'rate_limits': {name: bucket.snapshot() for name, bucket in self.buckets.items()}
+            }
+
+    def init_app(self, app, classes=None):
+        """`classes`: {endpoint: 'read' | 'write' | 'bulk'} para las rutas cuya clase
+        no se deduce del método (p. ej. importaciones largas). Registrar después de metrics.
+        La app expone stats() en /admission/stats (endpoint admission_stats), solo para admin."""
+        self._classes = dict(classes or {})
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+
+def _default_capacity(environ):
+    if environ.get('GUNICORN_WORKER_CLASS') == 'gevent':
+        return int(environ.get('GUNICORN_WORKER_CONNECTIONS', '1000'))
+    return int(environ.get('GUNICORN_THREADS', '4'))
+
+
+def admission_from_env(environ):
+    return Admission(
+        capacity=int(environ.get('ADMISSION_CAPACITY') or _default_capacity(environ)),
+        read_target=float(environ.get('ADMISSION_READ_TARGET_MS', '250')) / 1000,
+        write_target=float(environ.get('ADMISSION_WRITE_TARGET_MS', '1000')) / 1000,
+        write_share=float(environ.get('ADMISSION_WRITE_SHARE', '0.75')),
+        retry_after=int(environ.get('ADMISSION_RETRY_AFTER', '1')),
+        enabled=environ.get('ADMISSION_ENABLED', '1') == '1'
+    )
+
+
+# ============ Benchmark ============
+
+def _bench_app(admission, backend_capacity, service_time):
+    """App mínima: /work pasa por un backend (la base de datos) que solo atiende
+    `backend_capacity` consultas a la vez; /health/live no lo toca"""
+    app = Flask('admission-bench')
+    backend = threading.BoundedSemaphore(backend_capacity)
+
+    @app.route('/work')
+    def work():
+        with backend:
+            time.sleep(service_time)
+        return jsonify({'ok': True})
+
+    @app.route('/health/live')
+    def health_live():
+        return jsonify({'status': 'alive'})
+
+    if admission is not None:
+        admission.init_app(app)
+    return app
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def _overload(app, threads, clients, seconds, health_every, retry_delay):
+    """`clients` clientes sin pausa contra un servidor de `threads` hilos (como gthread)"""
+    pool = ThreadPoolExecutor(max_workers=threads)
+    client = app.test_client()
+    results = {'work': [], 'health': [], 'rejected': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def run_client(index):
+        i = 0
+        while time.perf_counter() < deadline:
+            i += 1
+            kind = 'health' if i % health_every == index % health_every else 'work'
+            path = '/health/live' if kind == 'health' else '/work'
+            started = time.perf_counter()
+            status = pool.submit(lambda: client.get(path).status_code).result()
+            elapsed = time.perf_counter() - started
+            with lock:
+                if status == 503:
+                    results['rejected'] += 1
+                else:
+                    results[kind].append(elapsed)
+            if status == 503:
+                # Un cliente real espera Retry-After antes de reintentar
+                time.sleep(retry_delay)
+
+    workers = [threading.Thread(target=run_client, args=(i,)) for i in range(clients)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    pool.shutdown()
+    return results
+
+
+def register_commands(app):
+    @app.cli.command('bench-admission')
+    @click.option('--clients', default=64, help='Clientes concurrentes (sobrecarga)')
+    @click.option('--threads', default=8, help='Hilos del servidor simulado')
+    @click.option('--backend-capacity', default=4, help='Consultas simultáneas que admite el backend')
+    @click.option('--service-ms', default=20.0, help='Duración de cada consulta al backend')
+    @click.option('--target-ms', default=100.0, help='Latencia objetivo de las lecturas')
+    @click.option('--retry-ms', default=100.0, help='Espera de un cliente tras un 503')
+    @click.option('--seconds', default=5.0, help='Duración de cada escenario')
+    def bench_admission_command(clients, threads, backend_capacity, service_ms, target_ms, retry_ms, seconds):
+        """p50/p99 de /work y /health/live bajo sobrecarga, sin y con control de admisión"""
+        scenarios = (
+            ('no admission', None),
+            ('admission', Admission(capacity=threads, read_target=target_ms / 1000, write_target=target_ms / 1000)),
+        )
+        for label, admission in scenarios:
+            bench = _bench_app(admission, backend_capacity, service_ms / 1000)
+            results = _overload(bench, threads, clients, seconds, health_every=10, retry_delay=retry_ms / 1000)
+            served = len(results['work'])
+            print(f"{label:<13} work: {served / seconds:7.0f} ok/s  p50 {_percentile(results['work'], 0.5) * 1000:7.1f} ms"
+                  f"  p99 {_percentile(results['work'], 0.99) * 1000:7.1f} ms  rejected {results['rejected']:6d}"
+                  f" | health p99 {_percentile(results['health'], 0.99) * 1000:7.1f} ms")
+            if admission is not None:
+                print(f"{'':<13} read limit settled at {admission.limits['read'].limit:.1f}")
@@ -0,0 +1,85 @@
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+class WaitStats:
+    """Tiempo que las peticiones esperan para obtener una conexión del pool"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self):
+        with self._lock:
+            avg = self.total_seconds / self.checkouts if self.checkouts else 0.0
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_avg_ms': round(avg * 1000, 3),
+                'wait_max_ms': round(self.max_seconds * 1000, 3),
+                'wait_total_ms': round(self.total_seconds * 1000, 3)
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool que mide la espera de cada checkout"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = WaitStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - start)
+        return conn
+
+
+def engine_options(uri, pool_size, max_overflow, pool_recycle, pool_pre_ping, pool_timeout):
+    """Opciones para create_engine según el motor (SQLite no usa QueuePool)"""
+    if uri.startswith('sqlite'):
+        return {'pool_pre_ping': pool_pre_ping}
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_recycle': pool_recycle,
+        'pool_pre_ping': pool_pre_ping,
+        'pool_timeout': pool_timeout
+    }
+
+
+def pool_stats(engine):
+    """Estado actual del pool: tamaño, conexiones en uso, overflow y esperas"""
+    pool = engine.pool
+    stats = {'pool_class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0),
+            'max_overflow': pool._max_overflow
+        })
+    wait_stats = getattr(pool, 'wait_stats', None)
+    if wait_stats is not None:
+        stats.update(wait_stats.snapshot())
+    return stats
@@ -0,0 +1,128 @@
+# Prueba de carga del servicio real: servidor de desarrollo de Flask frente a
+# gunicorn con gunicorn.conf.py, ambos en subprocesos sobre la misma base de datos.
+#   flask bench-server   req/s y p99 por ruta en cada modo
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import click
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEV_SERVER = ('from app import create_app; '
+              'create_app().run(host="127.0.0.1", port={port}, debug=True, use_reloader=False)')
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _get(conn, path):
+    conn.request('GET', path)
+    response = conn.getresponse()
+    response.read()
+    return response.status
+
+
+def _start(label, args, env, port, timeout=30):
+    """Arrancar el servidor y esperar a que /health/live responda"""
+    process = subprocess.Popen(args, cwd=SERVICE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise click.ClickException(f'{label} exited with status {process.returncode}')
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+        try:
+            if _get(conn, '/health/live') == 200:
+                return process
+        except (OSError, http.client.HTTPException):
+            pass
+        finally:
+            conn.close()
+        time.sleep(0.2)
+    _stop(process)
+    raise click.ClickException(f'{label} did not answer /health/live on port {port} in {timeout}s')
+
+
+def _stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=35)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def _load(port, path, concurrency, seconds):
+    """`concurrency` clientes sin pausa, cada uno con su conexión keep-alive"""
+    latencies = []
+    errors = []
+    rejected = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status = _get(conn, path)
+            except (OSError, http.client.HTTPException):
+                # El servidor cerró la conexión (p. ej. al reciclar el worker): la siguiente abre otra
+                conn.close()
+                status = None
+            elapsed = time.perf_counter() - started
+            with lock:
+                if status in (429, 503):
+                    # Control de admisión (admission.py): el servidor está saturado
+                    rejected.append(elapsed)
+                elif status is None or status >= 400:
+                    errors.append(elapsed)
+                else:
+                    latencies.append(elapsed)
+        conn.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)] if latencies else 0.0
+    return len(latencies) / seconds, p99, len(rejected), len(errors)
+
+
+def register_commands(app, default_paths):
+    @app.cli.command('bench-server')
+    @click.option('--path', 'paths', multiple=True, help='Rutas a medir (repetible)')
+    @click.option('--concurrency', default=32, help='Clientes simultáneos')
+    @click.option('--seconds', default=10.0, help='Duración por ruta y modo')
+    @click.option('--workers', default=None, type=int, help='GUNICORN_WORKERS (por defecto el de gunicorn.conf.py)')
+    def bench_server_command(paths, concurrency, seconds, workers):
+        """req/s y p99 del servidor de desarrollo frente a gunicorn (gunicorn.conf.py)"""
+        paths = list(paths or default_paths)
+        port = _free_port()
+        env = dict(os.environ, PORT=str(port))
+        # Si no, app.run() no arranca al heredar el entorno de `flask`
+        env.pop('FLASK_RUN_FROM_CLI', None)
+        if workers:
+            env['GUNICORN_WORKERS'] = str(workers)
+        modes = (
+            ('dev server', [sys.executable, '-c', DEV_SERVER.format(port=port)]),
+            ('gunicorn', [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:create_app()']),
+        )
+        for label, args in modes:
+            process = _start(label, args, env, port)
+            try:
+                for path in paths:
+                    rps, p99, rejected, errors = _load(port, path, concurrency, seconds)
+                    print(f"{label:<11} {path:<28} {rps:8.0f} ok/s  p99 {p99 * 1000:8.1f} ms  "
+                          f"rejected {rejected}  errors {errors} ({concurrency} clients)")
+            finally:
+                _stop(process)
@@ -0,0 +1,189 @@
+# Migraciones versionadas e idempotentes, ejecutadas al desplegar (no al arrancar):
+#   flask db-upgrade                   aplica las migraciones pendientes
+#   flask db-check-plans [--min-rows]  EXPLAIN de las consultas críticas;
+#                                      falla si alguna recorre la tabla completa
+import click
+from sqlalchemy import inspect, text
+
+SCHEMA_TABLE = 'schema_migrations'
+
+
+def ensure_index(conn, table, name, columns):
+    """Crear un índice salvo que ya exista uno que empiece por esas columnas"""
+    for index in inspect(conn).get_indexes(table):
+        if index['name'] == name or index['column_names'][:len(columns)] == list(columns):
+            return False
+    conn.execute(text(f'CREATE INDEX {name} ON {table} ({", ".join(columns)})'))
+    return True
+
+
+def ensure_column(conn, table, name, ddl):
+    """Añadir una columna si la tabla aún no la tiene"""
+    if name in {column['name'] for column in inspect(conn).get_columns(table)}:
+        return False
+    conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {name} {ddl}'))
+    return True
+
+
+def applied_versions(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            f'CREATE TABLE IF NOT EXISTS {SCHEMA_TABLE} ('
+            'version INTEGER PRIMARY KEY, '
+            'description VARCHAR(200) NOT NULL, '
+            'applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)'
+        ))
+        return {row[0] for row in conn.execute(text(f'SELECT version FROM {SCHEMA_TABLE}'))}
+
+
+def upgrade(db):
+    """Aplicar en orden las migraciones que falten; devuelve cuántas se aplicaron"""
+    applied = applied_versions(db.engine)
+    count = 0
+    for version, description, step in MIGRATIONS:
+        if version in applied:
+            continue
+        step(db)
+        with db.engine.begin() as conn:
+            conn.execute(
+                text(f'INSERT INTO {SCHEMA_TABLE} (version, description) VALUES (:v, :d)'),
+                {'v': version, 'd': description}
+            )
+        print(f"✅ Migration {version}: {description}")
+        count += 1
+    return count
+
+
+def _full_scans(conn, dialect, sql):
+    if dialect == 'mysql':
+        rows = conn.execute(text(f'EXPLAIN {sql}')).mappings().all()
+        return [row['table'] for row in rows if row['type'] == 'ALL']
+    if dialect == 'sqlite':
+        rows = conn.execute(text(f'EXPLAIN QUERY PLAN {sql}')).all()
+        details = [row[-1] for row in rows]
+        return [d.split()[1] for d in details if d.startswith('SCAN ') and ' USING ' not in d]
+    return []
+
+
+def check_plans(db, min_rows=1000):
+    """EXPLAIN de HOT_QUERIES; devuelve las consultas que hacen full scan.
+
+    Las tablas con menos de `min_rows` filas se omiten: con tan pocos datos
+    el optimizador prefiere un recorrido completo aunque exista el índice.
+    """
+    dialect = db.engine.dialect.name
+    failures = []
+    with db.engine.connect() as conn:
+        for name, table, sql, dialects in HOT_QUERIES:
+            if dialects and dialect not in dialects:
+                continue
+            rows = conn.execute(text(f'SELECT COUNT(*) FROM {table}')).scalar()
+            if rows < min_rows:
+                print(f"- {name}: skipped ({rows} rows in {table})")
+                continue
+            scanned = _full_scans(conn, dialect, sql)
+            if scanned:
+                failures.append(name)
+                print(f"❌ {name}: full scan on {', '.join(scanned)}")
+            else:
+                print(f"✅ {name}")
+    return failures
+
+
+def register_commands(app, db):
+    @app.cli.command('db-upgrade')
+    def db_upgrade_command():
+        """Aplicar las migraciones pendientes"""
+        applied = upgrade(db)
+        print(f"✅ Schema up to date ({applied} migrations applied)")
+
+    @app.cli.command('db-check-plans')
+    @click.option('--min-rows', default=1000, help='Omitir tablas con menos filas')
+    def db_check_plans_command(min_rows):
+        """Verificar con EXPLAIN que las consultas críticas usan índices"""
+        if check_plans(db, min_rows):
+            raise SystemExit(1)
+
+
+# ============ MIGRACIONES DE CATALOG ============
+
+def baseline_schema(db):
+    db.create_all()
+
+
+def fulltext_search_index(db):
+    import search
+    search.ensure_fulltext_index(db.engine)
+
+
+def hot_path_indexes(db):
+    with db.engine.begin() as conn:
+        ensure_index(conn, 'books', 'ix_books_seller_id_id', ['seller_id', 'id'])
+        ensure_index(conn, 'books', 'ix_books_stock', ['stock'])
+        ensure_index(conn, 'books', 'ix_books_created_at_id', ['created_at', 'id'])
+
+
+def projection_columns(db):
+    with db.engine.begin() as conn:
+        ensure_column(conn, 'books', 'source_version', 'BIGINT NOT NULL DEFAULT 0')
+        ensure_column(conn, 'books', 'updated_at', 'DATETIME NULL')
+
+
+def table_versions(db):
+    # Versión inicial de los listados: la última aplicada por la proyección
+    from app import Book, TableVersion
+    import http_cache
+    db.create_all()
+    latest = db.session.query(db.func.max(Book.source_version)).scalar() or 0
+    http_cache.bump_version(db, TableVersion, 'books', latest)
+    db.session.commit()
+
+
+def replica_heartbeat_table(db):
+    import db_routing
+    db_routing.create_heartbeat_table(db.engine)
+
+
+def created_at_not_null(db):
+    # El cursor por (created_at, id) no puede avanzar sobre NULL; los libros
+    # proyectados sin fecha reciben la de su última actualización
+    with db.engine.begin() as conn:
+        conn.execute(text(
+            'UPDATE books SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP) '
+            'WHERE created_at IS NULL'
+        ))
+        dialect = conn.dialect.name
+        if dialect == 'mysql':
+            conn.execute(text(
+                'ALTER TABLE books MODIFY created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP'
+            ))
+        elif dialect == 'postgresql':
+            conn.execute(text('ALTER TABLE books ALTER COLUMN created_at SET NOT NULL'))
+        # SQLite no altera columnas: basta con el relleno (create_all ya la crea NOT NULL)
+
+
+def book_tombstones_table(db):
+    db.create_all()
+
+
+MIGRATIONS = [
+    (1, 'baseline schema', baseline_schema),
+    (2, 'full-text index on books', fulltext_search_index),
+    (3, 'indexes for seller, stock and created_at listings', hot_path_indexes),
+    (4, 'projection version columns on books', projection_columns),
+    (5, 'table versions for HTTP validators', table_versions),
+    (6, 'replica heartbeat table', replica_heartbeat_table),
+    (7, 'books.created_at not null', created_at_not_null),
+    (8, 'book tombstones for the projection', book_tombstones_table),
+]
+
+# (nombre, tabla, consulta, motores en los que aplica; None = todos)
+HOT_QUERIES = [
+    ('books by seller', 'books', 'SELECT id FROM books WHERE seller_id = 1 ORDER BY id LIMIT 51', None),
+    ('available books', 'books',
+     'SELECT id FROM books WHERE stock > 0 AND id > 100 ORDER BY id LIMIT 51', None),
+    ('catalog by created_at', 'books', 'SELECT id FROM books ORDER BY created_at, id LIMIT 51', None),
+    ('search', 'books',
+     "SELECT id FROM books WHERE MATCH (title, author, description) "
+     "AGAINST ('+tolkien*' IN BOOLEAN MODE)", ('mysql',)),
+]
@@ -0,0 +1,125 @@
+import base64
+import json
+from datetime import datetime
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+STREAM_BATCH_SIZE = 500
+SORT_KEYS = ('id', 'created_at')
+
+
+class PageArgs:
+    """Parámetros de paginación por cursor leídos de la query string"""
+
+    def __init__(self, limit, cursor, fields, sort, stream, include_total):
+        self.limit = limit
+        self.cursor = cursor
+        self.fields = fields
+        self.sort = sort
+        self.stream = stream
+        self.include_total = include_total
+
+
+def _flag(value):
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def parse_page_args(args, allowed_fields, accept='', keyset=True):
+    """Validar limit, cursor, fields, sort, stream y include_total.
+
+    Con keyset=False el cursor es un desplazamiento (resultados ordenados
+    por relevancia). Lanza ValueError con un mensaje apto para devolver
+    como 400.
+    """
+    stream = _flag(args.get('stream', '')) or 'application/x-ndjson' in (accept or '')
+
+    raw_limit = args.get('limit')
+    if raw_limit is None:
+        limit = None if stream else DEFAULT_LIMIT
+    else:
+        try:
+            limit = int(raw_limit)
+        except ValueError:
+            raise ValueError('limit must be an integer')
+        if limit < 1 or limit > MAX_LIMIT:
+            raise ValueError(f'limit must be between 1 and {MAX_LIMIT}')
+
+    sort = args.get('sort', 'id')
+    if sort not in SORT_KEYS:
+        raise ValueError(f'sort must be one of: {", ".join(SORT_KEYS)}')
+
+    fields = list(allowed_fields)
+    if args.get('fields'):
+        requested = [f.strip() for f in args['fields'].split(',') if f.strip()]
+        unknown = [f for f in requested if f not in allowed_fields]
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+        # id siempre se selecciona: es la clave del cursor
+        fields = ['id'] + [f for f in requested if f != 'id']
+        if sort == 'created_at' and 'created_at' not in fields:
+            fields.append('created_at')
+
+    cursor = None
+    if args.get('cursor'):
+        cursor = decode_cursor(args['cursor'], sort) if keyset else decode_offset_cursor(args['cursor'])
+
+    return PageArgs(limit, cursor, fields, sort, stream, _flag(args.get('include_total', '')))
+
+
+def encode_cursor(sort, row):
+    if sort == 'created_at':
+        created_at = row['created_at']
+        key = [created_at.isoformat() if isinstance(created_at, datetime) else created_at, row['id']]
+    else:
+        key = [row['id']]
+    raw = json.dumps([sort] + key).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(raw, sort):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(raw.encode('ascii')))
+        if data[0] != sort:
+            raise ValueError
+        if sort == 'created_at':
+            # created_at es NOT NULL (migración 7): un cursor sin fecha no es válido
+            return datetime.fromisoformat(data[1]), int(data[2])
+        return (int(data[1]),)
+    except (ValueError, TypeError, IndexError, KeyError):
+        raise ValueError('Invalid cursor')
+
+
+def encode_offset_cursor(mode, offset):
+    raw = json.dumps(['offset', mode, offset]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_offset_cursor(raw):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(raw.encode('ascii')))
+        if data[0] != 'offset' or int(data[2]) < 0:
+            raise ValueError
+        return data[1], int(data[2])
+    except (ValueError, TypeError, IndexError, KeyError):
+        raise ValueError('Invalid cursor')
+
+
+def keyset_query(query, model, page):
+    """Aplicar orden y condición de keyset sobre una consulta de columnas"""
+    if page.sort == 'created_at':
+        if page.cursor is not None:
+            created_at, last_id = page.cursor
+            query = query.filter(
+                (model.created_at > created_at) |
+                ((model.created_at == created_at) & (model.id > last_id))
+            )
+        return query.order_by(model.created_at, model.id)
+
+    if page.cursor is not None:
+        query = query.filter(model.id > page.cursor[0])
+    return query.order_by(model.id)
+
+
+def row_to_dict(fields, row):
+    # Las fechas se quedan como datetime: el proveedor JSON las escribe en ISO 8601
+    return dict(zip(fields, row))
@@ -0,0 +1,109 @@
+import threading
+from datetime import datetime
+
+from sqlalchemy import inspect
+
+BOOK_COLUMNS = ('title', 'author', 'description', 'price', 'stock', 'seller_id')
+
+
+class ProjectionStats:
+    """Progreso de la proyección de libros en este proceso"""
+
+    def __init__(self):
+        self.events_applied = 0
+        self.events_skipped = 0
+        self.last_version = 0
+        self.last_lag_seconds = 0.0
+        self.last_applied_at = None
+        self._lock = threading.Lock()
+
+    def record(self, applied, skipped, last_version, lag_seconds):
+        with self._lock:
+            self.events_applied += applied
+            self.events_skipped += skipped
+            self.last_version = max(self.last_version, last_version)
+            self.last_lag_seconds = lag_seconds
+            self.last_applied_at = datetime.utcnow()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'events_applied': self.events_applied,
+                'events_skipped': self.events_skipped,
+                'last_version': self.last_version,
+                'last_lag_seconds': round(self.last_lag_seconds, 3),
+                'last_applied_at': self.last_applied_at.isoformat() if self.last_applied_at else None
+            }
+
+
+def _parse_datetime(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def apply_events(db, Book, BookTombstone, events):
+    """Aplicar un lote de eventos del outbox de orders-service (sin commit).
+
+    Cada libro guarda la versión (id de evento) que lo produjo; los eventos
+    con versión menor o igual se ignoran, así que reenviar un lote es
+    inofensivo (el relay reenvía siempre en orden desde el más antiguo sin
+    confirmar). Los borrados dejan una lápida: un borrado gana aunque
+    llegue después de un evento posterior del mismo libro (los ids del
+    outbox pueden confirmarse desordenados) y un upsert reenviado no
+    resucita un libro borrado. Devuelve (aplicados, ignorados, ids afectados).
+    """
+    events = sorted(events, key=lambda e: e['version'])
+    book_ids = {e['book_id'] for e in events}
+    current = {
+        book.id: book
+        for book in Book.query.filter(Book.id.in_(book_ids)).all()
+    } if book_ids else {}
+    tombstones = {
+        tombstone.book_id: tombstone
+        for tombstone in BookTombstone.query.filter(BookTombstone.book_id.in_(book_ids)).all()
+    } if book_ids else {}
+
+    applied = skipped = 0
+    affected = set()
+    for event in events:
+        book = current.get(event['book_id'])
+        tombstone = tombstones.get(event['book_id'])
+        if tombstone is not None and tombstone.version >= event['version']:
+            skipped += 1
+            continue
+
+        if event['event'] == 'delete':
+            # Sin comparar con source_version: en orders-service la fila ya no existe.
+            # La lápida cubre también lo ya aplicado, por si se reenvía después.
+            version = max(event['version'], book.source_version or 0) if book is not None else event['version']
+            if book is not None:
+                # Creado en este mismo lote (reenvío): basta con descartarlo
+                if inspect(book).pending:
+                    db.session.expunge(book)
+                else:
+                    db.session.delete(book)
+                current.pop(event['book_id'])
+            if tombstone is None:
+                tombstone = BookTombstone(book_id=event['book_id'])
+                db.session.add(tombstone)
+                tombstones[tombstone.book_id] = tombstone
+            tombstone.version = version
+        elif book is not None and (book.source_version or 0) >= event['version']:
+            skipped += 1
+            continue
+        else:
+            data = event['book']
+            if book is None:
+                # created_at=None anularía el valor por defecto: el cursor por fecha necesita una
+                created_at = _parse_datetime(data.get('created_at')) or datetime.utcnow()
+                book = Book(id=event['book_id'], created_at=created_at)
+                db.session.add(book)
+                current[book.id] = book
+            for column in BOOK_COLUMNS:
+                setattr(book, column, data.get(column))
+            book.source_version = event['version']
+            book.updated_at = datetime.utcnow()
+
+        applied += 1
+        affected.add(event['book_id'])
+
+    return applied, skipped, affected
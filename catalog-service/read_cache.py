@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalBackend:
+    """Backend en proceso: LRU acotado con TTL, guarda bytes ya serializados"""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def size(self):
+        return len(self._data)
+
+
+class RedisBackend:
+    """Backend compartido entre réplicas (requiere el paquete `redis`)"""
+
+    def __init__(self, url, prefix='catalog:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.evictions = 0
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=max(1, int(ttl)))
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + k for k in keys])
+
+    def size(self):
+        return None
+
+
+class ReadCache:
+    """Caché read-through de respuestas JSON del catálogo.
+
+    Las fichas de libro se guardan por id y versión de la fila, y los
+    listados por su ETag (que incluye la versión de la tabla). Ambas
+    versiones se leen de la base de datos en cada petición, así que un
+    cambio aplicado por cualquier worker o réplica cambia la clave en todos
+    sin difundir invalidaciones: las entradas viejas ya no se leen y caducan
+    por TTL/LRU. Con LocalBackend cada worker tiene su copia (más memoria,
+    más fallos), nunca datos obsoletos.
+    """
+
+    def __init__(self, backend, ttl=60):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def book_key(book_id, version):
+        return f'book:{book_id}:{version}'
+
+    @staticmethod
+    def listing_key(etag):
+        return f'list:{etag}'
+
+    def get(self, key):
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.backend.set(key, value, self.ttl)
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.backend.evictions,
+            'size': self.backend.size(),
+            'backend': type(self.backend).__name__
+        }
+
+
+def cache_from_env(environ):
+    url = environ.get('CATALOG_CACHE_URL')
+    backend = RedisBackend(url) if url else LocalBackend(int(environ.get('CATALOG_CACHE_SIZE', '10000')))
+    return ReadCache(backend, ttl=float(environ.get('CATALOG_CACHE_TTL', '60')))
@@ -0,0 +1,207 @@
+# Búsqueda de libros: FULLTEXT en MySQL y prefijos de palabra con LIKE en el
+# resto de motores (SQLite en desarrollo, con tildes plegadas por fold()).
+#   flask bench-search   latencia de /catalog/search con 10k, 100k y 1M libros
+import random
+import re
+import sqlite3
+import time
+import unicodedata
+from datetime import datetime
+
+import click
+from sqlalchemy import case, delete, event, func, insert, or_, text
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.engine import Engine
+
+FULLTEXT_INDEX = 'ft_books_title_author_description'
+# innodb_ft_min_token_size por defecto
+MIN_TOKEN_SIZE = 3
+MAX_TERMS = 8
+MAX_OFFSET = 1000
+
+STRICT = 'strict'
+RELAXED = 'relaxed'
+
+
+def _fold_table():
+    # Letras latinas con tilde/diéresis/cedilla -> letra base ("á" -> "a", "ç" -> "c")
+    table = {}
+    for codepoint in range(0xC0, 0x250):
+        char = chr(codepoint)
+        base = ''.join(c for c in unicodedata.normalize('NFKD', char) if not unicodedata.combining(c))
+        if base != char:
+            table[codepoint] = base
+    return table
+
+
+FOLD_TABLE = _fold_table()
+
+
+def fold(value):
+    """Minúsculas y sin tildes ("García" -> "garcia"). En SQLite se llama
+    desde SQL por cada fila, de ahí la tabla precalculada en vez de NFKD"""
+    if value is None:
+        return None
+    return value.lower().translate(FOLD_TABLE)
+
+
+def tokenize(query):
+    """Normalizar (minúsculas, sin tildes) y separar en términos"""
+    normalized = unicodedata.normalize('NFKD', query.lower())
+    normalized = ''.join(ch for ch in normalized if not unicodedata.combining(ch))
+    return re.findall(r'\w+', normalized)[:MAX_TERMS]
+
+
+def _escape_like(term):
+    # "_" es carácter de palabra (\w) y llega a los términos; en LIKE es comodín
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _register_fold(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function('fold', 1, fold, deterministic=True)
+
+
+def init_engines():
+    """Registrar fold() en cada conexión SQLite nueva (las colaciones de MySQL
+    ya ignoran tildes y mayúsculas; FULLTEXT también)"""
+    if not event.contains(Engine, 'connect', _register_fold):
+        event.listen(Engine, 'connect', _register_fold)
+
+
+def _relaxed_prefix(term):
+    # Tolerancia a erratas en la segunda mitad de la palabra: "tolkein" -> "tolk*"
+    return term[:max(MIN_TOKEN_SIZE, int(len(term) * 0.6))]
+
+
+def boolean_query(terms, mode):
+    """Expresión para MATCH ... AGAINST (... IN BOOLEAN MODE)"""
+    terms = [t for t in terms if len(t) >= MIN_TOKEN_SIZE]
+    if mode == STRICT:
+        return ' '.join(f'+{t}*' for t in terms)
+    return ' '.join(f'{_relaxed_prefix(t)}*' for t in terms)
+
+
+def relevance(model, dialect, terms, mode):
+    """Devuelve (criterios, expresión de puntuación) para el modo pedido"""
+    if dialect == 'mysql' and any(len(t) >= MIN_TOKEN_SIZE for t in terms):
+        score = match(
+            model.title, model.author, model.description,
+            against=boolean_query(terms, mode)
+        ).in_boolean_mode()
+        return [score > 0], score
+
+    # Alternativa portable (SQLite en desarrollo): prefijo de palabra ponderado por columna
+    prefixes = terms if mode == STRICT else [_relaxed_prefix(t) for t in terms]
+    columns = ((3, model.title), (2, model.author), (1, model.description))
+    if dialect == 'sqlite':
+        # Los términos ya vienen plegados; la columna se pliega igual (ver init_engines)
+        columns = tuple((weight, func.fold(column)) for weight, column in columns)
+        like = lambda column, pattern: column.like(pattern, escape='\\')
+    else:
+        like = lambda column, pattern: column.ilike(pattern, escape='\\')
+    per_term = []
+    score = 0
+    for prefix in map(_escape_like, prefixes):
+        conditions = []
+        for weight, column in columns:
+            # Inicio de palabra: al principio o tras un espacio (un solo LIKE por columna)
+            hit = like(' ' + column, f'% {prefix}%')
+            conditions.append(hit)
+            score = score + case((hit, weight), else_=0)
+        per_term.append(or_(*conditions))
+
+    if mode == STRICT:
+        return per_term, score
+    return [or_(*per_term)], score
+
+
+def ensure_fulltext_index(engine, table='books'):
+    """Crear el índice FULLTEXT si no existe (solo MySQL)"""
+    if engine.dialect.name != 'mysql':
+        return False
+    with engine.begin() as conn:
+        exists = conn.execute(text(
+            "SELECT COUNT(*) FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = :table AND index_name = :index"
+        ), {'table': table, 'index': FULLTEXT_INDEX}).scalar()
+        if exists:
+            return False
+        conn.execute(text(
+            f'ALTER TABLE {table} ADD FULLTEXT INDEX {FULLTEXT_INDEX} (title, author, description)'
+        ))
+    return True
+
+
+# ============ Benchmark ============
+
+BENCH_WORDS = (
+    'hobbit', 'anillo', 'dragón', 'océano', 'canción', 'historia', 'ciudad', 'noche',
+    'jardín', 'invierno', 'camino', 'montaña', 'sombra', 'corazón', 'guerra', 'memoria',
+    'silencio', 'viaje', 'espejo', 'isla', 'fuego', 'río', 'tiempo', 'estrella',
+)
+BENCH_AUTHORS = (
+    'Gabriel García Márquez', 'J. R. R. Tolkien', 'Isabel Allende', 'Ursula K. Le Guin',
+    'Jorge Luis Borges', 'Mario Vargas Llosa', 'Ana María Matute', 'Terry Pratchett',
+)
+BENCH_QUERIES = ('tolkien', 'garcia marquez', 'dragon invierno', 'tolkein', 'snake_case')
+
+
+def _bench_rows(rng, count, seller_id, now):
+    for _ in range(count):
+        yield {
+            'title': ' '.join(rng.choice(BENCH_WORDS) for _ in range(3)).capitalize(),
+            'author': rng.choice(BENCH_AUTHORS),
+            'description': ' '.join(rng.choice(BENCH_WORDS) for _ in range(30)),
+            'price': 9.99, 'stock': 1, 'seller_id': seller_id, 'created_at': now,
+        }
+
+
+def _grow(db, model, rng, count, seller_id, batch_size=5000):
+    now = datetime.utcnow()
+    rows = _bench_rows(rng, count, seller_id, now)
+    while count > 0:
+        batch = [next(rows) for _ in range(min(batch_size, count))]
+        db.session.execute(insert(model), batch)
+        db.session.commit()
+        count -= len(batch)
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def register_commands(app, db, model):
+    @app.cli.command('bench-search')
+    @click.option('--rows', 'sizes', multiple=True, type=int, help='Tamaños de la tabla (repetible)')
+    @click.option('--repeat', default=20, help='Repeticiones de cada consulta por tamaño')
+    @click.option('--seller-id', default=-1, help='Vendedor ficticio de los libros generados')
+    def bench_search_command(sizes, repeat, seller_id):
+        """p50/p99 de /catalog/search por consulta con 10k, 100k y 1M libros.
+
+        Inserta libros de prueba (commits reales) hasta cada tamaño y los borra al final.
+        """
+        sizes = sorted(sizes or (10000, 100000, 1000000))
+        client = app.test_client()
+        rng = random.Random(0)
+        ensure_fulltext_index(db.engine)
+        inserted = 0
+        try:
+            for size in sizes:
+                _grow(db, model, rng, size - inserted, seller_id)
+                inserted = size
+                for query in BENCH_QUERIES:
+                    timings = []
+                    for _ in range(repeat):
+                        started = time.perf_counter()
+                        response = client.get('/catalog/search', query_string={'q': query, 'limit': 20})
+                        timings.append(time.perf_counter() - started)
+                    body = response.get_json()
+                    print(f"{size:>9} rows  {query!r:<18} {len(body.get('books', [])):3d} hits "
+                          f"({body.get('match')})  p50 {_percentile(timings, 0.5) * 1000:8.1f} ms"
+                          f"  p99 {_percentile(timings, 0.99) * 1000:8.1f} ms")
+        finally:
+            db.session.rollback()
+            db.session.execute(delete(model).where(model.seller_id == seller_id))
+            db.session.commit()
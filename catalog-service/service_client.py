@@ -0,0 +1,162 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class UpstreamUnavailable(Exception):
+    """El circuito del servicio está abierto: la llamada se rechaza sin red"""
+
+
+class CircuitBreaker:
+    """Circuito closed -> open -> half-open con una sonda a la vez"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=10):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            # half-open: solo deja pasar una sonda
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class ServiceClient:
+    """Cliente HTTP con pool keep-alive y circuit breaker para un servicio"""
+
+    def __init__(self, name, base_url, pool_size=20, connect_timeout=0.5,
+                 read_timeout=2.0, failure_threshold=5, reset_timeout=10):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # Callback opcional (name, method, outcome, seconds) para métricas
+        self.observer = None
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'errors': 0,
+            'rejected': 0,
+            'latency_total_ms': 0.0,
+            'latency_max_ms': 0.0
+        }
+
+    def request(self, method, path, **kwargs):
+        if not self.breaker.allow():
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise UpstreamUnavailable(f'{self.name} circuit is open')
+
+        kwargs.setdefault('timeout', self.timeout)
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, f'{self.base_url}{path}', **kwargs)
+        except BaseException:
+            # Cualquier excepción (no solo de requests; también gevent.Timeout o
+            # una petición abortada) cuenta como fallo: si no, una sonda en
+            # half-open dejaría _probing activo y el circuito no se cerraría nunca
+            self._record(start, method, 'error', failed=True)
+            raise
+
+        self._record(start, method, str(response.status_code), failed=response.status_code >= 500)
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def probe(self, path, timeout):
+        """GET fuera del circuit breaker y de las estadísticas (sondas de salud):
+        una sonda ni consume el hueco de half-open ni abre el circuito"""
+        try:
+            return self.session.get(f'{self.base_url}{path}', timeout=timeout).status_code == 200
+        except requests.RequestException:
+            return False
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def _record(self, start, method, outcome, failed):
+        elapsed = time.perf_counter() - start
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['latency_total_ms'] += elapsed_ms
+            self._stats['latency_max_ms'] = max(self._stats['latency_max_ms'], elapsed_ms)
+            if failed:
+                self._stats['errors'] += 1
+        if failed:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        if self.observer:
+            self.observer(self.name, method, outcome, elapsed)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        requests_done = stats['requests']
+        stats['latency_avg_ms'] = round(stats['latency_total_ms'] / requests_done, 3) if requests_done else 0.0
+        stats['latency_total_ms'] = round(stats['latency_total_ms'], 3)
+        stats['latency_max_ms'] = round(stats['latency_max_ms'], 3)
+        stats['circuit'] = self.breaker.state
+        stats['base_url'] = self.base_url
+        return stats
+
+
+def client_from_env(name, base_url, environ):
+    """Construir un ServiceClient con los límites configurados por entorno.
+
+    El tamaño del pool puede fijarse por servicio (p. ej. AUTH_POOL_SIZE)
+    o de forma global con UPSTREAM_POOL_SIZE.
+    """
+    pool_size = environ.get(f'{name.upper()}_POOL_SIZE', environ.get('UPSTREAM_POOL_SIZE', '20'))
+    return ServiceClient(
+        name,
+        base_url,
+        pool_size=int(pool_size),
+        connect_timeout=float(environ.get('UPSTREAM_CONNECT_TIMEOUT', '0.5')),
+        read_timeout=float(environ.get('UPSTREAM_READ_TIMEOUT', '2')),
+        failure_threshold=int(environ.get('CIRCUIT_FAILURE_THRESHOLD', '5')),
+        reset_timeout=float(environ.get('CIRCUIT_RESET_SECONDS', '10'))
+    )
@@ -0,0 +1,191 @@
+# Estado compartido entre los workers de gunicorn y las réplicas del servicio.
+#   SHARED_STORE_URL=redis://redis:6379/0   obligatorio con varios workers o réplicas
+# Sin URL el estado vive en memoria del proceso: vale para el servidor de
+# desarrollo o GUNICORN_WORKERS=1. En producción (FLASK_CONFIG=production) con
+# varios workers el arranque falla en vez de dejar revocaciones e
+# invalidaciones que solo ve el worker que atendió la petición.
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Mensajes que conserva cada canal (los workers nuevos los reaplican al arrancar)
+STREAM_MAXLEN = 10000
+
+# Cubo de tokens atómico en Redis; el reloj es el del servidor, común a todos los workers
+TAKE_SCRIPT = """
+local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(state[1]) or burst
+local at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - at) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return tostring(wait)
+"""
+
+
+class LocalStore:
+    """Estado en memoria del proceso (un único worker)"""
+
+    shared = False
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._values = OrderedDict()
+        self._streams = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._values.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._values[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._values.pop(key, None)
+            self._values[key] = (value, time.monotonic() + ttl)
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+
+    def take(self, key, rate, burst):
+        """Cubo de tokens: 0 si había un token (y lo consume); si no, segundos hasta el siguiente"""
+        now = time.monotonic()
+        with self._lock:
+            item = self._values.pop(key, None)
+            tokens, updated_at = item[0] if item and item[1] > now else (burst, now)
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate
+            # Tras burst / rate segundos sin uso el cubo vuelve a estar lleno: la entrada sobra
+            self._values[key] = ((tokens, now), now + burst / rate)
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+        return wait
+
+    def append(self, stream, message):
+        with self._lock:
+            entries = self._streams.setdefault(stream, deque(maxlen=STREAM_MAXLEN))
+            entries.append((next(self._ids), message))
+
+    def read(self, stream, after=None):
+        """Mensajes posteriores a `after` (todos si es None): [(id, mensaje)]"""
+        with self._lock:
+            entries = list(self._streams.get(stream, ()))
+        return [(i, m) for i, m in entries if after is None or i > after]
+
+
+class RedisStore:
+    """Estado compartido en Redis (requiere el paquete `redis`)"""
+
+    shared = True
+
+    def __init__(self, url, prefix):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._take = self.client.register_script(TAKE_SCRIPT)
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return value.decode('utf-8') if value is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, px=max(1, int(ttl * 1000)))
+
+    def take(self, key, rate, burst):
+        return float(self._take(keys=[self.prefix + key], args=[rate, burst]))
+
+    def append(self, stream, message):
+        self.client.xadd(self.prefix + stream, {'m': json.dumps(message)},
+                         maxlen=STREAM_MAXLEN, approximate=True)
+
+    def read(self, stream, after=None):
+        key = self.prefix + stream
+        response = self.client.xread({key: after or '0-0'}, count=STREAM_MAXLEN)
+        return [(entry_id.decode('utf-8'), json.loads(fields[b'm']))
+                for _, entries in response for entry_id, fields in entries]
+
+
+class Broadcast:
+    """Mensajes para todos los workers (revocaciones, invalidaciones).
+
+    `publish` aplica el mensaje en este worker al momento; el resto lo
+    aplica en su siguiente `poll`, como mucho `poll_interval` segundos
+    después. Un worker nuevo reaplica los mensajes conservados, así que
+    `handler` debe ser idempotente.
+    """
+
+    def __init__(self, store, channel, handler, poll_interval=1.0):
+        self.store = store
+        self.channel = channel
+        self.handler = handler
+        self.poll_interval = poll_interval
+        self.published = 0
+        self.received = 0
+        self._last_id = None
+        self._polled_at = 0.0
+        self._lock = threading.Lock()
+
+    def publish(self, message):
+        try:
+            self.store.append(self.channel, message)
+            self.published += 1
+        except Exception as e:
+            # Al menos este worker lo aplica; el resto, al caducar sus cachés
+            print(f"Broadcast {self.channel}: publish failed: {e}")
+        return self.handler(message)
+
+    def poll(self):
+        now = time.monotonic()
+        if now - self._polled_at < self.poll_interval:
+            return
+        # Un solo hilo consulta; el resto sigue sin esperar
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._polled_at = now
+            try:
+                entries = self.store.read(self.channel, self._last_id)
+            except Exception as e:
+                print(f"Broadcast {self.channel}: poll failed: {e}")
+                return
+            for entry_id, message in entries:
+                self.handler(message)
+                self._last_id = entry_id
+                self.received += 1
+        finally:
+            self._lock.release()
+
+    def stats(self):
+        return {'published': self.published, 'received': self.received,
+                'shared': self.store.shared}
+
+
+def store_from_env(environ, prefix):
+    url = environ.get('SHARED_STORE_URL')
+    if url:
+        return RedisStore(url, prefix)
+    workers = int(environ.get('GUNICORN_WORKERS', '1'))
+    if workers > 1:
+        message = (f'SHARED_STORE_URL is not set with GUNICORN_WORKERS={workers}: '
+                   'revocations, invalidations and rate limits would only reach one worker')
+        if environ.get('FLASK_CONFIG') == 'production':
+            raise RuntimeError(message)
+        print(f"Warning: {message}")
+    return LocalStore()
@@ -0,0 +1,216 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+
+from shared_store import Broadcast, LocalStore
+from single_flight import SingleFlight, SingleFlightTimeout
+
+
+class TTLCache:
+    """Caché LRU acotada con expiración por entrada (thread-safe)"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+            return item[0] if item else None
+
+    def discard_where(self, predicate):
+        """Eliminar todas las entradas cuyo valor cumpla el predicado"""
+        with self._lock:
+            keys = [k for k, (v, _) in self._data.items() if predicate(v)]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def _token_key(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class TokenVerifier:
+    """Verificación local de JWT emitidos por auth-service.
+
+    La firma y la expiración se comprueban localmente con el secreto
+    compartido y los claims que `login` incluye (email, name, is_admin).
+    Cada `revalidate_seconds` el usuario se confirma contra auth-service
+    `/validate`, de modo que un usuario eliminado o degradado deja de pasar
+    dentro de esa ventana. Con `revalidate_seconds=0` la verificación es
+    puramente local. Las peticiones simultáneas con el mismo token comparten
+    una sola llamada a `/validate`. Las revocaciones se difunden a todos los
+    workers a través de `store` (ver shared_store.py).
+    """
+
+    def __init__(self, secret_key, auth_client, cache_size=10000,
+                 cache_ttl=300, revalidate_seconds=60, max_token_lifetime=7200,
+                 algorithms=('HS256',), coalesce_timeout=5.0, store=None):
+        self.secret_key = secret_key
+        self.auth_client = auth_client
+        self.algorithms = list(algorithms)
+        self.revalidate_seconds = revalidate_seconds
+        self.max_token_lifetime = max_token_lifetime
+        # token (hash) -> usuario ya verificado
+        token_ttl = min(cache_ttl, revalidate_seconds) if revalidate_seconds else cache_ttl
+        self._tokens = TTLCache(cache_size, token_ttl)
+        # user_id -> usuario confirmado por auth-service
+        self._users = TTLCache(cache_size, revalidate_seconds or cache_ttl)
+        # tokens revocados explícitamente, hasta que expirarían por sí solos
+        self._revoked = TTLCache(cache_size, max_token_lifetime)
+        self._flight = SingleFlight('validate', coalesce_timeout)
+        self._revocations = Broadcast(store or LocalStore(), 'auth-revocations', self._apply_revocation)
+
+    def verify(self, token):
+        """Devuelve {'valid': True, 'user': {...}} o None si el token no es válido"""
+        self._revocations.poll()
+        key = _token_key(token)
+        if self._revoked.get(key):
+            return None
+        user = self._tokens.get(key)
+        if user is not None:
+            return {'valid': True, 'user': user}
+
+        claims = self._decode(token)
+        if claims is None:
+            return None
+        user_id = claims['sub']
+
+        user = self._confirm_user(user_id, token, claims)
+        if user is None:
+            return None
+
+        self._tokens.set(key, user, ttl=claims['exp'] - time.time())
+        return {'valid': True, 'user': user}
+
+    def _decode(self, token):
+        """Claims de un token de acceso con firma y expiración válidas (sub ya como int), o None"""
+        try:
+            claims = jwt.decode(
+                token,
+                self.secret_key,
+                algorithms=self.algorithms,
+                options={'require': ['exp', 'sub']}
+            )
+        except jwt.PyJWTError:
+            return None
+
+        if claims.get('type', 'access') != 'access':
+            return None
+
+        try:
+            claims['sub'] = int(claims['sub'])
+        except (TypeError, ValueError):
+            return None
+        return claims
+
+    def claimed_user_id(self, token):
+        """Id del usuario de un token con firma y expiración válidas, sin
+        revocaciones ni auth-service: para límites por usuario previos a verify()"""
+        claims = self._decode(token)
+        return claims['sub'] if claims else None
+
+    def _confirm_user(self, user_id, token, claims):
+        local_user = {
+            'id': user_id,
+            'name': claims.get('name'),
+            'email': claims.get('email'),
+            'is_admin': bool(claims.get('is_admin', False))
+        }
+        if not self.revalidate_seconds:
+            return local_user
+
+        user = self._users.get(user_id)
+        if user is not None:
+            return user
+
+        try:
+            return self._flight.do(_token_key(token), lambda: self._fetch_user(user_id, token, local_user))
+        except SingleFlightTimeout as e:
+            # La validación en curso tarda demasiado: igual que con auth-service caído
+            print(f"Error refreshing token claims: {e}")
+            return local_user
+
+    def _fetch_user(self, user_id, token, local_user):
+        try:
+            response = self.auth_client.get(
+                '/validate',
+                headers={'Authorization': f'Bearer {token}'}
+            )
+        except Exception as e:
+            # auth-service no disponible (o circuito abierto): se confía en los claims firmados
+            print(f"Error refreshing token claims: {e}")
+            return local_user
+
+        if response.status_code in (401, 404, 422):
+            # token rechazado o usuario eliminado
+            return None
+        if response.status_code != 200:
+            return local_user
+
+        user = response.json().get('user') or local_user
+        self._users.set(user_id, user)
+        return user
+
+    def revoke_user(self, user_id):
+        """Olvidar todo lo cacheado de un usuario en todos los workers; su
+        próxima petición se revalida. Devuelve los tokens olvidados en este"""
+        return self._revocations.publish({'user_id': user_id})
+
+    def revoke_token(self, token):
+        return bool(self._revocations.publish({
+            'token': _token_key(token),
+            'expires_at': time.time() + self.max_token_lifetime
+        }))
+
+    def _apply_revocation(self, message):
+        if 'user_id' in message:
+            self._users.pop(message['user_id'])
+            return self._tokens.discard_where(lambda user: user.get('id') == message['user_id'])
+        self._revoked.set(message['token'], True, ttl=message['expires_at'] - time.time())
+        return int(self._tokens.pop(message['token']) is not None)
+
+    def stats(self):
+        return {
+            'cached_tokens': len(self._tokens),
+            'confirmed_users': len(self._users),
+            'revoked_tokens': len(self._revoked),
+            'revalidate_seconds': self.revalidate_seconds,
+            'revocations': self._revocations.stats(),
+            'coalesced_validations': self._flight.stats()
+        }
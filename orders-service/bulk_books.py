@@ -0,0 +1,301 @@
+# Importación y exportación masiva del catálogo de un vendedor (CSV o NDJSON).
+# Ambas trabajan en streaming: la subida se parsea línea a línea y la
+# exportación se lee con un cursor del lado del servidor.
+import codecs
+import csv
+import io
+import json
+import math
+import time
+from datetime import datetime
+
+import click
+
+FORMATS = ('csv', 'ndjson')
+IMPORT_COLUMNS = ('title', 'author', 'description', 'price', 'stock')
+EXPORT_COLUMNS = ('id', 'title', 'author', 'description', 'price', 'stock', 'created_at')
+DEFAULT_BATCH_SIZE = 1000
+MAX_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+
+
+def detect_format(requested, content_type):
+    """Formato pedido (?format=) o deducido del Content-Type; ValueError si no se reconoce"""
+    fmt = (requested or '').lower()
+    if not fmt:
+        content_type = (content_type or '').lower()
+        if 'csv' in content_type:
+            fmt = 'csv'
+        elif 'ndjson' in content_type or 'jsonl' in content_type:
+            fmt = 'ndjson'
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+    return fmt
+
+
+def _csv_lines(stream, state):
+    """Líneas de texto de la subida. Una línea que no es UTF-8 se decodifica con
+    reemplazo y se marca en `state` para reportar su fila como error"""
+    encoding = 'utf-8-sig'
+    for line in stream:
+        try:
+            text = line.decode(encoding)
+        except UnicodeDecodeError:
+            text = line.decode('utf-8', errors='replace')
+            state['invalid'] = True
+        encoding = 'utf-8'
+        yield text
+
+
+def iter_records(stream, fmt):
+    """Recorrer la subida sin cargarla entera; produce (número de fila, dict | error)"""
+    if fmt == 'csv':
+        state = {'invalid': False}
+        reader = csv.DictReader(_csv_lines(stream, state))
+        number = 0
+        while True:
+            try:
+                record = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                # El lector ya consumió la línea errónea: la siguiente fila se lee bien
+                record = f'Invalid CSV: {e}'
+            number += 1
+            if state['invalid']:
+                state['invalid'] = False
+                record = 'Invalid UTF-8'
+            yield number, record
+
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    number = 0
+    for line in stream:
+        try:
+            line = decoder.decode(line).strip()
+        except UnicodeDecodeError:
+            decoder.reset()
+            number += 1
+            yield number, 'Invalid UTF-8'
+            continue
+        if not line:
+            continue
+        number += 1
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield number, 'Invalid JSON'
+            continue
+        yield number, record if isinstance(record, dict) else 'Each line must be a JSON object'
+
+
+def _number(value, kind):
+    # bool es subclase de int: true/false no son un precio ni un stock
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise TypeError(value)
+    return kind(value)
+
+
+def validate_record(record):
+    """Normalizar una fila; devuelve (valores, None) o (None, mensaje de error)"""
+    if not isinstance(record, dict):
+        return None, record
+
+    title = record.get('title')
+    author = record.get('author')
+    description = record.get('description')
+    if not all(isinstance(value, str) for value in (title, author)):
+        return None, 'title and author are required and must be strings'
+    if description is not None and not isinstance(description, str):
+        return None, 'description must be a string'
+    title = title.strip()
+    author = author.strip()
+    if not title or not author:
+        return None, 'title and author are required'
+    if len(title) > 200 or len(author) > 100:
+        return None, 'title or author too long'
+
+    try:
+        price = _number(record.get('price'), float)
+        stock = record.get('stock')
+        stock = _number(stock, int) if stock not in (None, '') else 0
+    except (TypeError, ValueError, OverflowError):
+        return None, 'price and stock must be numeric'
+    if not math.isfinite(price):
+        return None, 'price must be a finite number'
+    if price < 0 or stock < 0:
+        return None, 'price and stock must not be negative'
+
+    return {
+        'title': title,
+        'author': author,
+        'description': description or '',
+        'price': price,
+        'stock': stock
+    }, None
+
+
+class ImportReport:
+    """Resultado de una importación: filas insertadas, errores por fila y ritmo"""
+
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors = []
+        self.truncated = False
+        self.started = time.perf_counter()
+
+    def error(self, row, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'error': message})
+
+    def to_dict(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            'imported': self.imported,
+            'failed': self.failed,
+            'batches': self.batches,
+            'errors': self.errors,
+            'truncated': self.truncated,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(self.imported / elapsed, 1) if elapsed else None
+        }
+
+
+def _insert_batch(db, Book, BookOutbox, seller_id, rows):
+    """INSERT multi-fila del lote y sus eventos de outbox, en la transacción actual.
+
+    MySQL no tiene RETURNING: los ids nuevos se recuperan por vendedor a
+    partir del id más alto que tenía antes del INSERT (índice seller_id, id).
+    """
+    watermark = db.session.query(db.func.max(Book.id)).filter(Book.seller_id == seller_id).scalar() or 0
+    db.session.execute(db.insert(Book), [dict(row, seller_id=seller_id) for row in rows])
+
+    created = Book.query.filter(Book.seller_id == seller_id, Book.id > watermark).order_by(Book.id).all()
+    now = datetime.utcnow()
+    db.session.execute(db.insert(BookOutbox), [
+        {'book_id': book.id, 'event': 'upsert', 'payload': json.dumps(book.to_dict()), 'created_at': now}
+        for book in created
+    ])
+    # Las filas ya se cargaron para el outbox; no hace falta retenerlas en la sesión
+    for book in created:
+        db.session.expunge(book)
+
+
+def import_books(db, Book, BookOutbox, seller_id, records, batch_size=DEFAULT_BATCH_SIZE,
+                 max_rows=None, commit=True):
+    """Validar e insertar libros por lotes; cada lote confirma por separado.
+
+    Un lote que falla en la base de datos se descarta completo y sus filas
+    se reportan como error; los lotes anteriores quedan importados.
+    """
+    report = ImportReport()
+    batch = []
+
+    def flush():
+        if not batch:
+            return
+        try:
+            _insert_batch(db, Book, BookOutbox, seller_id, [values for _, values in batch])
+            if commit:
+                db.session.commit()
+            report.imported += len(batch)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error importing batch: {e}")
+            for number, _ in batch:
+                report.error(number, 'Database error')
+        report.batches += 1
+        batch.clear()
+
+    for number, record in records:
+        if max_rows and number > max_rows:
+            report.truncated = True
+            break
+        values, error = validate_record(record)
+        if error:
+            report.error(number, error)
+            continue
+        batch.append((number, values))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return report
+
+
+def export_query(db, Book, seller_id, batch_size=DEFAULT_BATCH_SIZE):
+    """Libros del vendedor por id, leídos con cursor de servidor en lotes"""
+    columns = [getattr(Book, name) for name in EXPORT_COLUMNS]
+    return (
+        db.session.query(*columns)
+        .filter(Book.seller_id == seller_id)
+        .order_by(Book.id)
+        .execution_options(stream_results=True)
+        .yield_per(batch_size)
+    )
+
+
+def _export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def export_lines(rows, fmt, chunk_rows=500):
+    """Serializar filas como CSV o NDJSON, agrupando varias filas por fragmento"""
+    buffer = io.StringIO()
+    writer = None
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+
+    pending = 0
+    for row in rows:
+        values = [_export_value(value) for value in row]
+        if writer:
+            writer.writerow(values)
+        else:
+            buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, values))))
+            buffer.write('\n')
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _synthetic_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(IMPORT_COLUMNS)
+    for i in range(rows):
+        writer.writerow([f'Bench title {i}', f'Bench author {i % 500}', 'bench', 10 + i % 90, i % 20])
+    return io.BytesIO(buffer.getvalue().encode('utf-8'))
+
+
+def register_commands(app, db, Book, BookOutbox):
+    @app.cli.command('books-bench')
+    @click.option('--rows', default=20000, help='Filas sintéticas a importar y exportar')
+    @click.option('--batch-size', default=DEFAULT_BATCH_SIZE)
+    @click.option('--seller-id', default=-1, help='Vendedor ficticio para las filas de prueba')
+    def books_bench_command(rows, batch_size, seller_id):
+        """Medir filas/s de importación y exportación (todo se revierte al final)"""
+        try:
+            upload = _synthetic_csv(rows)
+            report = import_books(
+                db, Book, BookOutbox, seller_id, iter_records(upload, 'csv'),
+                batch_size=batch_size, commit=False
+            ).to_dict()
+            print(f"import: {report['imported']} rows in {report['elapsed_seconds']}s "
+                  f"({report['rows_per_second']} rows/s, {report['batches']} batches)")
+
+            started = time.perf_counter()
+            exported = sum(
+                chunk.count('\n') for chunk in export_lines(export_query(db, Book, seller_id, batch_size), 'ndjson')
+            )
+            elapsed = time.perf_counter() - started
+            print(f"export: {exported} rows in {elapsed:.3f}s ({exported / elapsed:.1f} rows/s)")
+        finally:
+            db.session.rollback()
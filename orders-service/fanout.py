@@ -0,0 +1,115 @@
+# Llamadas independientes a otros servicios en paralelo.
+#   flask bench-fanout --latency-ms 50   capacidad por worker en serie frente a FanOut
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import click
+
+
+class FanOut:
+    """Ejecuta llamadas independientes a otros servicios en paralelo.
+
+    La primera llamada corre en el hilo de la petición y el resto en un
+    pool compartido, así que varias llamadas cuestan lo que la más lenta y
+    no la suma. Con workers gevent los hilos del pool son greenlets.
+    """
+
+    def __init__(self, max_workers=16):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fanout')
+
+    def gather(self, first, *rest):
+        """Devuelve los resultados en orden; la primera excepción se propaga"""
+        futures = [self.executor.submit(call) for call in rest]
+        try:
+            head = first()
+        finally:
+            # Esperar siempre al resto para no dejar llamadas huérfanas
+            wait(futures)
+        return [head] + [future.result() for future in futures]
+
+
+# ============ Benchmark ============
+
+class _StubUpstream(BaseHTTPRequestHandler):
+    """auth /validate y catalog /catalog/<id> de mentira, con latencia inyectada"""
+    latency = 0.05
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        body = b'{"user": {"id": 1}}' if self.path.startswith('/validate') else b'{"book": {"id": 1, "price": 1.0}}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def _load(handler, concurrency, seconds):
+    """`concurrency` peticiones a la vez (los hilos de un worker gthread) durante `seconds`"""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                handler()
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+                continue
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)] if latencies else 0.0
+    return len(latencies) / seconds, p99, len(errors)
+
+
+def register_commands(app):
+    @app.cli.command('bench-fanout')
+    @click.option('--latency-ms', default=50.0, help='Latencia inyectada en cada upstream')
+    @click.option('--concurrency', default=4, help='Peticiones simultáneas por worker (GUNICORN_THREADS)')
+    @click.option('--seconds', default=5.0, help='Duración de cada escenario')
+    def bench_fanout_command(latency_ms, concurrency, seconds):
+        """Capacidad por worker de la parte remota de /purchase: llamadas en serie frente a FanOut"""
+        from service_client import ServiceClient
+
+        _StubUpstream.latency = latency_ms / 1000
+        server = _StubServer(('127.0.0.1', 0), _StubUpstream)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+        auth = ServiceClient('auth', base_url, pool_size=concurrency * 2)
+        catalog = ServiceClient('catalog', base_url, pool_size=concurrency * 2)
+        fanout = FanOut(max_workers=concurrency)
+        try:
+            scenarios = (
+                ('sequential', lambda: (auth.get('/validate').json(), catalog.get('/catalog/1').json())),
+                ('fanout', lambda: fanout.gather(lambda: auth.get('/validate').json(),
+                                                 lambda: catalog.get('/catalog/1').json())),
+            )
+            for label, handler in scenarios:
+                rps, p99, errors = _load(handler, concurrency, seconds)
+                print(f"{label:<11} {rps:8.1f} req/s per worker  p99 {p99 * 1000:7.1f} ms  errors {errors} "
+                      f"({concurrency} concurrent, {latency_ms:.0f} ms per upstream)")
+        finally:
+            fanout.executor.shutdown()
+            server.shutdown()
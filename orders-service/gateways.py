@@ -0,0 +1,76 @@
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class GatewayError(Exception):
+    """Fallo del proveedor externo; `retryable` indica si conviene reintentar"""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class FakeGateway:
+    """Pasarela simulada en proceso (pagos y transportistas).
+
+    `delay` imita la latencia del proveedor y `failure_rate` la proporción
+    de fallos transitorios. Las operaciones son idempotentes por clave:
+    repetir una llamada con la misma clave devuelve el resultado original
+    sin volver a cobrar ni a generar otro envío.
+    """
+
+    def __init__(self, delay=0.5, failure_rate=0.0, max_keys=10000):
+        self.delay = delay
+        self.failure_rate = failure_rate
+        self.max_keys = max_keys
+        self.calls = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _call(self, idempotency_key, build):
+        with self._lock:
+            self.calls += 1
+            if idempotency_key in self._results:
+                return self._results[idempotency_key]
+
+        time.sleep(self.delay)
+        if random.random() < self.failure_rate:
+            raise GatewayError('Gateway timeout')
+        result = build()
+
+        with self._lock:
+            result = self._results.setdefault(idempotency_key, result)
+            while len(self._results) > self.max_keys:
+                self._results.popitem(last=False)
+        return result
+
+    def charge(self, idempotency_key, amount, payment_method):
+        if amount <= 0:
+            raise GatewayError('Invalid amount', retryable=False)
+        if payment_method == 'declined':
+            # Método reservado para probar rechazos definitivos
+            raise GatewayError('Payment declined', retryable=False)
+        return self._call(idempotency_key, lambda: {
+            'transaction_id': f'txn_{uuid.uuid4().hex[:16]}',
+            'amount': amount
+        })
+
+    def ship(self, idempotency_key, provider_id, address):
+        if not address:
+            raise GatewayError('Missing address', retryable=False)
+        return self._call(idempotency_key, lambda: {
+            'tracking_number': f'TRK{uuid.uuid4().hex[:12].upper()}',
+            'provider_id': provider_id
+        })
+
+
+def gateway_from_env(name, environ):
+    """Pasarela simulada configurada con {NAME}_GATEWAY_DELAY y {NAME}_GATEWAY_FAILURE_RATE"""
+    prefix = name.upper()
+    return FakeGateway(
+        delay=float(environ.get(f'{prefix}_GATEWAY_DELAY', '0.5')),
+        failure_rate=float(environ.get(f'{prefix}_GATEWAY_FAILURE_RATE', '0'))
+    )
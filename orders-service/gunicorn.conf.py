@@ -0,0 +1,111 @@
+# Configuración de gunicorn para producción:
+#   gunicorn -c gunicorn.conf.py "app:create_app()"
+# Recarga sin cortes: kill -HUP <pid del maestro> (workers nuevos con el código
+# nuevo; con GUNICORN_PRELOAD=1 el código no se recarga, ver preload_app)
+import glob
+import math
+import os
+
+
+def container_cpus():
+    """CPUs disponibles según la cuota del cgroup (v2 o v1), o las del host"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+            quota = int(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period = int(f.read())
+        if quota > 0:
+            return max(1, math.ceil(quota / period))
+    except (OSError, ValueError):
+        pass
+    return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5003')}"
+workers = int(os.getenv('GUNICORN_WORKERS', container_cpus() * 2 + 1))
+# shared_store.py exige SHARED_STORE_URL si hay más de un worker
+os.environ['GUNICORN_WORKERS'] = str(workers)
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+# Con GUNICORN_WORKER_CLASS=gevent cada worker atiende muchas peticiones que
+# esperan a auth/catalog sin ocupar un hilo por cada una. Cada greenlet puede
+# necesitar una conexión: no más que el pool de la base de datos (DB_POOL_SIZE
+# + DB_MAX_OVERFLOW, valores de ProductionConfig), o esperarían al pool hasta
+# DB_POOL_TIMEOUT. Para más concurrencia, subir también el pool.
+# Con gthread worker_connections limita las conexiones keep-alive abiertas (no
+# las peticiones en curso, que ya limitan los hilos): ahí no se recorta.
+db_pool_capacity = int(os.getenv('DB_POOL_SIZE', '4')) + int(os.getenv('DB_MAX_OVERFLOW', '2'))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+if worker_class == 'gevent':
+    worker_connections = min(worker_connections, db_pool_capacity)
+    # El control de admisión (admission.py) usa este valor como capacidad
+    os.environ['GUNICORN_WORKER_CONNECTIONS'] = str(worker_connections)
+
+# Sin preload cada worker importa la app, así que kill -HUP carga el código
+# nuevo. Con GUNICORN_PRELOAD=1 la app se importa una vez en el maestro
+# (arranque más rápido, memoria compartida entre workers), pero HUP reutiliza
+# ese código: desplegar código nuevo exige reiniciar el maestro.
+# Con gevent nunca: la app debe importarse en el worker, después de que gevent
+# parchee threading y socket; si no, el pool de FanOut, los locks y las
+# sesiones de requests se crearían con hilos y sockets reales.
+preload_app = os.getenv('GUNICORN_PRELOAD', '0') == '1' and worker_class != 'gevent'
+
+backlog = int(os.getenv('GUNICORN_BACKLOG', '2048'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+
+# Reciclar workers periódicamente para acotar fugas de memoria
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+
+# Métricas agregadas entre workers (ver metrics.py). Debe definirse antes de
+# cargar la app, porque prometheus_client elige el modo al importarse.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus-metrics')
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+# El maestro las sirve en un puerto interno, fuera del Service y del Ingress
+# (solo para Prometheus); con METRICS_PORT vacío /metrics sigue en el de la app
+metrics_port = os.getenv('METRICS_PORT', '9100')
+os.environ['METRICS_PORT'] = metrics_port
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOGLEVEL', 'info')
+
+
+def on_starting(server):
+    # Descartar valores de una ejecución anterior (no se repite en recargas HUP)
+    for path in glob.glob(os.path.join(os.environ['PROMETHEUS_MULTIPROC_DIR'], '*.db')):
+        os.remove(path)
+
+
+def when_ready(server):
+    # Una sola vez por maestro: las recargas con HUP no vuelven a llamarlo
+    if not metrics_port:
+        return
+    from prometheus_client import CollectorRegistry, multiprocess, start_http_server
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    start_http_server(int(metrics_port), registry=registry)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        # La app aún no está importada: el worker crea su propio pool al cargarla
+        return
+    # Cada worker abre su propio pool de conexiones a la base de datos
+    from app import app, db
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -0,0 +1,31 @@
+# Sondas de Kubernetes:
+#   /health/live   el proceso responde (no consulta dependencias)
+#   /health/ready  la base de datos (y opcionalmente los servicios remotos) responde
+from sqlalchemy import text
+
+
+def check_database(db):
+    try:
+        with db.engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+        return True
+    except Exception as e:
+        print(f"Readiness: database check failed: {e}")
+        return False
+
+
+def check_upstream(client, timeout=(0.3, 0.5)):
+    # Sin pasar por el circuit breaker: las sondas (cada pocos segundos) no
+    # deben abrirlo ni ocupar la única llamada de prueba en half-open
+    return client.probe('/health/live', timeout)
+
+
+def readiness(db, clients=(), require_upstreams=False):
+    """Devuelve (cuerpo, status). Por defecto un servicio remoto caído no saca
+    al pod del balanceo (lo cubre el circuit breaker): solo se informa."""
+    checks = {'database': check_database(db)}
+    for client in clients:
+        checks[client.name] = check_upstream(client)
+
+    ready = checks['database'] and (not require_upstreams or all(checks.values()))
+    return {'status': 'ready' if ready else 'not ready', 'checks': checks}, 200 if ready else 503
@@ -0,0 +1,110 @@
+# Validadores HTTP (ETag fuerte) y Cache-Control para las lecturas públicas.
+# La ETag se deriva de la versión de la tabla (table_versions) o de la fila y
+# de la representación pedida (ruta, parámetros, formato), así que un
+# `If-None-Match` vigente se responde con 304 sin ejecutar la consulta ni
+# serializar. Toda escritura en una tabla versionada debe llamar a
+# bump_version() en la misma transacción.
+#   flask bench-http-cache --revalidate 0.8   bytes y latencia con y sin ETags
+import hashlib
+import os
+import random
+import time
+
+import click
+from flask import Response, request
+
+MAX_AGE = int(os.getenv('HTTP_CACHE_MAX_AGE', '10'))
+STATIC_MAX_AGE = int(os.getenv('HTTP_CACHE_STATIC_MAX_AGE', '3600'))
+
+# Datos que cambian con las ventas (stock): caché corta y revalidación
+PUBLIC = f'public, max-age={MAX_AGE}'
+# Datos de referencia que casi nunca cambian
+STATIC = f'public, max-age={STATIC_MAX_AGE}'
+# Respuestas por usuario: ningún intermediario las guarda, el navegador revalida
+PRIVATE = 'private, no-cache'
+
+
+def table_version(db, TableVersion, name):
+    return db.session.query(TableVersion.version).filter(TableVersion.name == name).scalar() or 0
+
+
+def bump_version(db, TableVersion, name, version=None):
+    """Cambiar la versión de una tabla (sin commit).
+
+    Sin `version` se incrementa en uno (lo normal en cada escritura). Con
+    `version` se guarda el máximo entre la actual y esa: solo sirve para
+    fijar un valor inicial, porque un valor menor que llegue tarde no la cambia.
+    """
+    if version is None:
+        criteria = [TableVersion.name == name]
+        values = {'version': TableVersion.version + 1}
+    else:
+        criteria = [TableVersion.name == name, TableVersion.version < version]
+        values = {'version': version}
+    result = db.session.execute(db.update(TableVersion).where(*criteria).values(**values))
+    if result.rowcount == 0 and db.session.get(TableVersion, name) is None:
+        db.session.add(TableVersion(name=name, version=version if version is not None else 1))
+
+
+def make_etag(*parts):
+    """ETag de la representación: `parts` (tabla, versión...) + ruta y parámetros"""
+    args = '&'.join(sorted(f'{k}={v}' for k, v in request.args.items(multi=True)))
+    raw = '|'.join(str(part) for part in (*parts, request.path, args))
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def decorate(response, etag, cache_control, vary=None):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    if vary:
+        response.vary.add(vary)
+    return response
+
+
+def not_modified(etag, cache_control, vary=None):
+    """Respuesta 304 si el cliente ya tiene esta versión; None si hay que generarla"""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    return decorate(Response(status=304), etag, cache_control, vary)
+
+
+# ============ Benchmark ============
+
+def _header_bytes(response):
+    return sum(len(name) + len(value) + 4 for name, value in response.headers.items())
+
+
+def _run(client, paths, count, revalidate):
+    """Peticiones/s, ms y bytes medios; una fracción `revalidate` envía la última ETag"""
+    etags = {}
+    total_bytes = not_modified_count = 0
+    started = time.perf_counter()
+    for i in range(count):
+        path = paths[i % len(paths)]
+        headers = {}
+        if path in etags and random.random() < revalidate:
+            headers['If-None-Match'] = etags[path]
+        response = client.get(path, headers=headers)
+        if response.status_code not in (200, 304):
+            raise click.ClickException(f'{path} returned {response.status_code}')
+        not_modified_count += response.status_code == 304
+        etags[path] = response.headers.get('ETag', etags.get(path))
+        total_bytes += len(response.data) + _header_bytes(response)
+    elapsed = time.perf_counter() - started
+    return count / elapsed, elapsed / count * 1000, total_bytes / count, not_modified_count / count
+
+
+def register_commands(app, default_paths):
+    @app.cli.command('bench-http-cache')
+    @click.option('--path', 'paths', multiple=True, help='Endpoints a medir (repetible)')
+    @click.option('--requests', 'count', default=2000, help='Peticiones por escenario')
+    @click.option('--revalidate', default=0.8, help='Fracción de peticiones que envían If-None-Match')
+    def bench_http_cache_command(paths, count, revalidate):
+        """Bytes transferidos y latencia: peticiones completas frente a una mezcla con revalidación"""
+        paths = list(paths or default_paths)
+        client = app.test_client()
+        random.seed(0)
+        for label, ratio in (('full GETs', 0.0), (f'{revalidate:.0%} revalidations', revalidate)):
+            rps, avg_ms, avg_bytes, hit_ratio = _run(client, paths, count, ratio)
+            print(f"{label:<20} {rps:8.0f} req/s {avg_ms:8.3f} ms/req "
+                  f"{avg_bytes:10.0f} bytes/req  304: {hit_ratio:.0%}")
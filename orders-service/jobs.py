@@ -0,0 +1,240 @@
+# Cola de trabajos en segundo plano (pagos y entregas) sobre la tabla `jobs`:
+#   flask jobs-worker                  hilos que reclaman trabajos con SKIP LOCKED
+#   flask jobs-worker --once           procesa lo pendiente y termina
+# Se pueden ejecutar varios workers a la vez: cada trabajo lo reclama uno solo.
+import json
+import random
+import signal
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import click
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+
+class JobQueue:
+    """Cola durable respaldada por la base de datos.
+
+    Un trabajo se reclama marcándolo `running` con un token y un plazo
+    (lease); si el worker muere, al vencer el plazo vuelve a la cola. Los
+    handlers llaman al proveedor externo con una clave de idempotencia
+    propia del trabajo, así que repetir un intento no duplica el cobro.
+    """
+
+    def __init__(self, db, Job, lease_seconds=60, backoff_base=2.0, backoff_max=300.0):
+        self.db = db
+        self.Job = Job
+        self.lease_seconds = lease_seconds
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.handlers = {}
+
+    def handler(self, kind, on_failure=None):
+        """Registrar el handler de un tipo de trabajo.
+
+        El handler recibe el trabajo, llama al proveedor y deja sus cambios
+        en la sesión (sin commit); devuelve el resultado a guardar.
+        `on_failure(job, error)` compensa cuando se agotan los reintentos.
+        """
+        def register(func):
+            self.handlers[kind] = (func, on_failure)
+            return func
+        return register
+
+    def enqueue(self, kind, user_id, purchase_id, payload, idempotency_key=None, max_attempts=5):
+        """Añadir un trabajo a la sesión (sin commit: va en la transacción de la petición)"""
+        job = self.Job(
+            kind=kind,
+            user_id=user_id,
+            purchase_id=purchase_id,
+            payload=json.dumps(payload),
+            idempotency_key=idempotency_key,
+            status=QUEUED,
+            attempts=0,
+            max_attempts=max_attempts,
+            run_after=datetime.utcnow()
+        )
+        self.db.session.add(job)
+        return job
+
+    def find_by_key(self, idempotency_key):
+        return self.Job.query.filter_by(idempotency_key=idempotency_key).first()
+
+    def requeue_expired(self):
+        """Devolver a la cola los trabajos cuyo worker no terminó a tiempo"""
+        Job = self.Job
+        requeued = self.db.session.execute(
+            self.db.update(Job)
+            .where(Job.status == RUNNING, Job.locked_until < datetime.utcnow())
+            .values(status=QUEUED, locked_by=None, locked_until=None)
+        ).rowcount
+        self.db.session.commit()
+        return requeued
+
+    def claim(self, batch_size=1):
+        """Reclamar hasta `batch_size` trabajos listos; devuelve (token, trabajos).
+
+        SKIP LOCKED hace que workers concurrentes se salten las filas que
+        otro está reclamando en lugar de esperar; el UPDATE condicional
+        mantiene la exclusión en motores que no lo soportan (SQLite).
+        """
+        Job = self.Job
+        now = datetime.utcnow()
+        ids = self.db.session.execute(
+            self.db.select(Job.id)
+            .where(Job.status == QUEUED, Job.run_after <= now)
+            .order_by(Job.run_after, Job.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not ids:
+            self.db.session.rollback()
+            return None, []
+
+        token = uuid.uuid4().hex
+        self.db.session.execute(
+            self.db.update(Job)
+            .where(Job.id.in_(ids), Job.status == QUEUED)
+            .values(
+                status=RUNNING,
+                attempts=Job.attempts + 1,
+                locked_by=token,
+                locked_until=now + timedelta(seconds=self.lease_seconds),
+                started_at=now
+            )
+        )
+        self.db.session.commit()
+        jobs = Job.query.filter(Job.id.in_(ids), Job.locked_by == token).order_by(Job.id).all()
+        return token, jobs
+
+    def _finish(self, job, token, **values):
+        """Cerrar el intento si el trabajo sigue siendo nuestro; commit de todo junto"""
+        Job = self.Job
+        owned = self.db.session.execute(
+            self.db.update(Job)
+            .where(Job.id == job.id, Job.locked_by == token)
+            .values(locked_by=None, locked_until=None, **values)
+        ).rowcount
+        if owned != 1:
+            # El plazo venció y otro worker lo reclamó: su intento manda
+            self.db.session.rollback()
+            return False
+        self.db.session.commit()
+        return True
+
+    def backoff(self, attempts):
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def run(self, job, token):
+        """Ejecutar un intento; devuelve el estado final del trabajo tras el intento"""
+        func, on_failure = self.handlers[job.kind]
+        try:
+            result = func(job)
+        except Exception as e:
+            self.db.session.rollback()
+            retryable = getattr(e, 'retryable', True)
+            if retryable and job.attempts < job.max_attempts:
+                run_after = datetime.utcnow() + timedelta(seconds=self.backoff(job.attempts))
+                self._finish(job, token, status=QUEUED, run_after=run_after, last_error=str(e))
+                return QUEUED
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+            if on_failure:
+                on_failure(job, e)
+            self._finish(job, token, status=FAILED, last_error=str(e), finished_at=datetime.utcnow())
+            return FAILED
+
+        self._finish(
+            job, token,
+            status=SUCCEEDED,
+            result=json.dumps(result),
+            last_error=None,
+            finished_at=datetime.utcnow()
+        )
+        return SUCCEEDED
+
+    def process_available(self, batch_size=1):
+        """Reclamar y ejecutar un lote; devuelve cuántos trabajos se procesaron"""
+        token, jobs = self.claim(batch_size)
+        for job in jobs:
+            self.run(job, token)
+        return len(jobs)
+
+    def stats(self):
+        """Trabajos por estado y retraso de la cola (antigüedad del más viejo listo)"""
+        Job = self.Job
+        counts = dict(
+            self.db.session.query(Job.status, self.db.func.count(Job.id))
+            .group_by(Job.status).all()
+        )
+        now = datetime.utcnow()
+        oldest = self.db.session.query(self.db.func.min(Job.run_after)).filter(
+            Job.status == QUEUED, Job.run_after <= now
+        ).scalar()
+        lag = (now - oldest).total_seconds() if oldest else 0.0
+        return {
+            'queued': counts.get(QUEUED, 0),
+            'running': counts.get(RUNNING, 0),
+            'succeeded': counts.get(SUCCEEDED, 0),
+            'failed': counts.get(FAILED, 0),
+            'lag_seconds': round(max(lag, 0.0), 3)
+        }
+
+
+def register_commands(app, queue):
+    @app.cli.command('jobs-worker')
+    @click.option('--concurrency', default=4, help='Hilos que procesan trabajos')
+    @click.option('--batch-size', default=1, help='Trabajos reclamados por consulta')
+    @click.option('--interval', default=0.5, help='Espera (s) cuando no hay trabajos')
+    @click.option('--once', is_flag=True, help='Procesar lo pendiente y terminar')
+    def jobs_worker_command(concurrency, batch_size, interval, once):
+        """Procesar pagos y entregas en segundo plano"""
+        stop = threading.Event()
+
+        def work():
+            # Cada hilo tiene su propio contexto y, por tanto, su propia sesión
+            with app.app_context():
+                while not stop.is_set():
+                    try:
+                        processed = queue.process_available(batch_size)
+                    except Exception as e:
+                        queue.db.session.rollback()
+                        print(f"Error processing jobs: {e}")
+                        stop.wait(interval * 4)
+                        continue
+                    if processed:
+                        continue
+                    if once:
+                        break
+                    stop.wait(interval)
+
+        def shutdown(signum, frame):
+            # Terminar los intentos en curso y salir (docker stop / rolling update)
+            stop.set()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        queue.requeue_expired()
+        workers = [
+            threading.Thread(target=work, name=f'jobs-worker-{i}')
+            for i in range(concurrency)
+        ]
+        for worker in workers:
+            worker.start()
+        print(f"✅ Jobs worker started ({concurrency} threads)")
+
+        last_requeue = time.monotonic()
+        while any(worker.is_alive() for worker in workers):
+            for worker in workers:
+                worker.join(timeout=1.0)
+            if time.monotonic() - last_requeue > queue.lease_seconds:
+                queue.requeue_expired()
+                last_requeue = time.monotonic()
+        print("✅ Jobs worker stopped")
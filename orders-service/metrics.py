@@ -0,0 +1,138 @@
+# Métricas en formato Prometheus (GET /metrics): latencia y estado por ruta,
+# peticiones en curso, consultas SQL por petición y llamadas a otros servicios.
+# Con gunicorn cada worker es un proceso; si PROMETHEUS_MULTIPROC_DIR está
+# definido (ver gunicorn.conf.py) /metrics devuelve la suma de todos ellos.
+# Con METRICS_PORT (gunicorn.conf.py) el maestro sirve /metrics en ese puerto
+# interno y la app no la expone: el Ingress publica todas sus rutas.
+import os
+import time
+
+from flask import Response, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REQUESTS = Counter(
+    'http_requests_total', 'Peticiones HTTP atendidas', ['method', 'route', 'status']
+)
+LATENCY = Histogram(
+    'http_request_duration_seconds', 'Latencia de las peticiones HTTP',
+    ['method', 'route'], buckets=LATENCY_BUCKETS
+)
+IN_FLIGHT = Gauge(
+    'http_requests_in_flight', 'Peticiones HTTP en curso', multiprocess_mode='livesum'
+)
+DB_QUERIES = Histogram(
+    'db_queries_per_request', 'Consultas SQL ejecutadas por petición',
+    ['route'], buckets=QUERY_COUNT_BUCKETS
+)
+DB_QUERY_TIME = Histogram(
+    'db_query_duration_seconds', 'Duración de cada consulta SQL',
+    ['route'], buckets=QUERY_BUCKETS
+)
+UPSTREAM_LATENCY = Histogram(
+    'upstream_request_duration_seconds', 'Latencia de las llamadas a otros servicios',
+    ['upstream', 'method', 'outcome'], buckets=LATENCY_BUCKETS
+)
+
+
+def _route():
+    """Plantilla de la ruta (/catalog/<int:book_id>), no la URL: acota la cardinalidad"""
+    if not has_request_context():
+        return 'none'
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+# ============ SQL (eventos del engine) ============
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['metrics_query_start'].pop()
+    DB_QUERY_TIME.labels(_route()).observe(time.perf_counter() - started)
+    if has_request_context() and 'metrics_queries' in g:
+        g.metrics_queries += 1
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get('metrics_query_start') if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+# ============ HTTP (hooks de Flask) ============
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+    g.metrics_queries = 0
+    IN_FLIGHT.inc()
+
+
+def _record(status):
+    route = _route()
+    REQUESTS.labels(request.method, route, status).inc()
+    LATENCY.labels(request.method, route).observe(time.perf_counter() - g.metrics_start)
+    DB_QUERIES.labels(route).observe(g.metrics_queries)
+    g.metrics_recorded = True
+
+
+def _after_request(response):
+    # En respuestas en streaming la latencia no incluye el envío del cuerpo
+    if 'metrics_start' in g:
+        _record(str(response.status_code))
+    return response
+
+
+def _teardown_request(exc):
+    if 'metrics_start' not in g:
+        return
+    if not g.get('metrics_recorded'):
+        # Excepción no controlada: after_request no llegó a ejecutarse
+        _record('500')
+    IN_FLIGHT.dec()
+
+
+def observe_upstream(name, method, outcome, seconds):
+    UPSTREAM_LATENCY.labels(name, method, outcome).observe(seconds)
+
+
+def metrics_view():
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), headers={'Content-Type': CONTENT_TYPE_LATEST})
+
+
+def init_app(app, clients=()):
+    """Instrumentar la app, sus clientes HTTP y todos los engines; expone /metrics"""
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    for client in clients:
+        client.observer = observe_upstream
+    if not os.environ.get('METRICS_PORT'):
+        # Sin gunicorn (servidor de desarrollo): en el puerto de la app
+        app.add_url_rule('/metrics', 'metrics', metrics_view, methods=['GET'])
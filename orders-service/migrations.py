@@ -0,0 +1,190 @@
+# Migraciones versionadas e idempotentes, ejecutadas al desplegar (no al arrancar):
+#   flask db-upgrade                   aplica las migraciones pendientes
+#   flask db-check-plans [--min-rows]  EXPLAIN de las consultas críticas;
+#                                      falla si alguna recorre la tabla completa
+import click
+from sqlalchemy import inspect, text
+
+SCHEMA_TABLE = 'schema_migrations'
+
+
+def ensure_index(conn, table, name, columns):
+    """Crear un índice salvo que ya exista uno que empiece por esas columnas"""
+    for index in inspect(conn).get_indexes(table):
+        if index['name'] == name or index['column_names'][:len(columns)] == list(columns):
+            return False
+    conn.execute(text(f'CREATE INDEX {name} ON {table} ({", ".join(columns)})'))
+    return True
+
+
+def ensure_column(conn, table, name, ddl):
+    """Añadir una columna si la tabla aún no la tiene"""
+    if name in {column['name'] for column in inspect(conn).get_columns(table)}:
+        return False
+    conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {name} {ddl}'))
+    return True
+
+
+def applied_versions(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            f'CREATE TABLE IF NOT EXISTS {SCHEMA_TABLE} ('
+            'version INTEGER PRIMARY KEY, '
+            'description VARCHAR(200) NOT NULL, '
+            'applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)'
+        ))
+        return {row[0] for row in conn.execute(text(f'SELECT version FROM {SCHEMA_TABLE}'))}
+
+
+def upgrade(db):
+    """Aplicar en orden las migraciones que falten; devuelve cuántas se aplicaron"""
+    applied = applied_versions(db.engine)
+    count = 0
+    for version, description, step in MIGRATIONS:
+        if version in applied:
+            continue
+        step(db)
+        with db.engine.begin() as conn:
+            conn.execute(
+                text(f'INSERT INTO {SCHEMA_TABLE} (version, description) VALUES (:v, :d)'),
+                {'v': version, 'd': description}
+            )
+        print(f"✅ Migration {version}: {description}")
+        count += 1
+    return count
+
+
+def _full_scans(conn, dialect, sql):
+    if dialect == 'mysql':
+        rows = conn.execute(text(f'EXPLAIN {sql}')).mappings().all()
+        return [row['table'] for row in rows if row['type'] == 'ALL']
+    if dialect == 'sqlite':
+        rows = conn.execute(text(f'EXPLAIN QUERY PLAN {sql}')).all()
+        details = [row[-1] for row in rows]
+        return [d.split()[1] for d in details if d.startswith('SCAN ') and ' USING ' not in d]
+    return []
+
+
+def check_plans(db, min_rows=1000):
+    """EXPLAIN de HOT_QUERIES; devuelve las consultas que hacen full scan.
+
+    Las tablas con menos de `min_rows` filas se omiten: con tan pocos datos
+    el optimizador prefiere un recorrido completo aunque exista el índice.
+    """
+    dialect = db.engine.dialect.name
+    failures = []
+    with db.engine.connect() as conn:
+        for name, table, sql, dialects in HOT_QUERIES:
+            if dialects and dialect not in dialects:
+                continue
+            rows = conn.execute(text(f'SELECT COUNT(*) FROM {table}')).scalar()
+            if rows < min_rows:
+                print(f"- {name}: skipped ({rows} rows in {table})")
+                continue
+            scanned = _full_scans(conn, dialect, sql)
+            if scanned:
+                failures.append(name)
+                print(f"❌ {name}: full scan on {', '.join(scanned)}")
+            else:
+                print(f"✅ {name}")
+    return failures
+
+
+def register_commands(app, db):
+    @app.cli.command('db-upgrade')
+    def db_upgrade_command():
+        """Aplicar las migraciones pendientes"""
+        applied = upgrade(db)
+        print(f"✅ Schema up to date ({applied} migrations applied)")
+
+    @app.cli.command('db-check-plans')
+    @click.option('--min-rows', default=1000, help='Omitir tablas con menos filas')
+    def db_check_plans_command(min_rows):
+        """Verificar con EXPLAIN que las consultas críticas usan índices"""
+        if check_plans(db, min_rows):
+            raise SystemExit(1)
+
+
+# ============ MIGRACIONES DE ORDERS ============
+
+def baseline_schema(db):
+    db.create_all()
+
+
+def seed_delivery_providers(db):
+    from app import initialize_delivery_providers
+    initialize_delivery_providers()
+
+
+def hot_path_indexes(db):
+    with db.engine.begin() as conn:
+        ensure_index(conn, 'purchases', 'ix_purchases_user_id_created_at', ['user_id', 'created_at'])
+        ensure_index(conn, 'purchases', 'ix_purchases_status_created_at', ['status', 'created_at'])
+        ensure_index(conn, 'payments', 'ix_payments_purchase_id', ['purchase_id'])
+        ensure_index(conn, 'deliveries', 'ix_deliveries_purchase_id', ['purchase_id'])
+        ensure_index(conn, 'books', 'ix_books_seller_id_id', ['seller_id', 'id'])
+        ensure_index(conn, 'books', 'ix_books_stock', ['stock'])
+
+
+def book_outbox_table(db):
+    # create_all solo crea las tablas que faltan
+    db.create_all()
+
+
+def jobs_table(db):
+    db.create_all()
+
+
+def table_versions(db):
+    from app import TableVersion
+    import http_cache
+    db.create_all()
+    # Primera versión de los proveedores ya sembrados (la siembra la fija en bases nuevas)
+    if db.session.get(TableVersion, 'delivery_providers') is None:
+        http_cache.bump_version(db, TableVersion, 'delivery_providers')
+    db.session.commit()
+
+
+def replica_heartbeat_table(db):
+    import db_routing
+    db_routing.create_heartbeat_table(db.engine)
+
+
+def sales_rollup_tables(db):
+    # Vacías: `flask sales-backfill` las rellena con el historial
+    db.create_all()
+
+
+MIGRATIONS = [
+    (1, 'baseline schema', baseline_schema),
+    (2, 'seed delivery providers', seed_delivery_providers),
+    (3, 'indexes for purchases, payments, deliveries and books', hot_path_indexes),
+    (4, 'book outbox table', book_outbox_table),
+    (5, 'background jobs table', jobs_table),
+    (6, 'table versions for HTTP validators', table_versions),
+    (7, 'replica heartbeat table', replica_heartbeat_table),
+    (8, 'seller and book daily sales rollups', sales_rollup_tables),
+]
+
+# (nombre, tabla, consulta, motores en los que aplica; None = todos)
+HOT_QUERIES = [
+    ('purchases by user', 'purchases',
+     'SELECT * FROM purchases WHERE user_id = 1 ORDER BY created_at', None),
+    ('expired reservations', 'purchases',
+     "SELECT id FROM purchases WHERE status = 'Pending Payment' "
+     "AND created_at < '2000-01-01' ORDER BY id LIMIT 200", None),
+    ('payment by purchase', 'payments', 'SELECT * FROM payments WHERE purchase_id = 1', None),
+    ('delivery by purchase', 'deliveries', 'SELECT * FROM deliveries WHERE purchase_id = 1', None),
+    ('books by seller', 'books', 'SELECT id FROM books WHERE seller_id = 1 ORDER BY id', None),
+    ('books in stock', 'books', 'SELECT id FROM books WHERE stock > 0', None),
+    ('pending outbox events', 'book_outbox',
+     'SELECT id FROM book_outbox WHERE published_at IS NULL ORDER BY id LIMIT 500', None),
+    ('ready jobs', 'jobs',
+     "SELECT id FROM jobs WHERE status = 'queued' AND run_after <= '2000-01-01' "
+     "ORDER BY run_after, id LIMIT 1", None),
+    ('seller daily sales', 'seller_daily_sales',
+     "SELECT * FROM seller_daily_sales WHERE seller_id = 1 AND day BETWEEN '2000-01-01' AND '2000-01-31'", None),
+    ('book sales by seller', 'book_daily_sales',
+     "SELECT book_id, SUM(revenue) FROM book_daily_sales WHERE seller_id = 1 "
+     "AND day BETWEEN '2000-01-01' AND '2000-01-31' GROUP BY book_id", None),
+]
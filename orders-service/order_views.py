@@ -0,0 +1,166 @@
+# Vista agregada de pedidos: compra + libro + último pago + última entrega
+# (con su proveedor) en un número fijo de consultas, sea cual sea el tamaño
+# de la página. Sustituye a la cadena /purchases/<id> → /payments/<id> →
+# /deliveries/<id> → catalog /catalog/<book_id> que hacían los clientes.
+#   flask bench-orders --orders 200 --page 20   consultas SQL y ms por página
+import time
+
+import click
+from sqlalchemy import event
+
+from json_provider import model_columns
+
+# Copia del libro incluida en el pedido (la tabla local de orders es la fuente)
+BOOK_SNAPSHOT_FIELDS = ('id', 'title', 'author', 'price', 'seller_id')
+
+
+class OrderViews:
+    def __init__(self, db, Purchase, Book, Payment, Delivery, DeliveryProvider):
+        self.db = db
+        self.Purchase = Purchase
+        self.Book = Book
+        self.Payment = Payment
+        self.Delivery = Delivery
+        self.DeliveryProvider = DeliveryProvider
+
+    def load(self, criteria, limit=None):
+        """Pedidos que cumplen `criteria`, del más reciente al más antiguo (3 consultas)"""
+        Purchase, Book = self.Purchase, self.Book
+        purchase_fields = Purchase.API_FIELDS
+        query = (
+            self.db.session.query(
+                *model_columns(Purchase), *[getattr(Book, name) for name in BOOK_SNAPSHOT_FIELDS]
+            )
+            .outerjoin(Book, Book.id == Purchase.book_id)
+            .filter(*criteria)
+            .order_by(Purchase.id.desc())
+        )
+        if limit:
+            query = query.limit(limit)
+
+        views = []
+        for row in query.all():
+            book = dict(zip(BOOK_SNAPSHOT_FIELDS, row[len(purchase_fields):]))
+            views.append({
+                'purchase': dict(zip(purchase_fields, row[:len(purchase_fields)])),
+                'book': book if book['id'] is not None else None,
+                'payment': None,
+                'delivery': None,
+            })
+        if not views:
+            return views
+
+        by_purchase = {view['purchase']['id']: view for view in views}
+        for payment in self._latest(self.Payment, list(by_purchase)):
+            by_purchase[payment['purchase_id']]['payment'] = payment
+        for delivery in self._latest_deliveries(list(by_purchase)):
+            by_purchase[delivery['purchase_id']]['delivery'] = delivery
+        return views
+
+    def _latest_ids(self, model, purchase_ids):
+        # Un pago rechazado o una entrega fallida pueden reintentarse: vale la última fila
+        return (
+            self.db.select(self.db.func.max(model.id))
+            .where(model.purchase_id.in_(purchase_ids))
+            .group_by(model.purchase_id)
+        )
+
+    def _latest(self, model, purchase_ids):
+        rows = (
+            self.db.session.query(*model_columns(model))
+            .filter(model.id.in_(self._latest_ids(model, purchase_ids)))
+            .all()
+        )
+        return [dict(zip(model.API_FIELDS, row)) for row in rows]
+
+    def _latest_deliveries(self, purchase_ids):
+        Delivery, Provider = self.Delivery, self.DeliveryProvider
+        delivery_fields = Delivery.API_FIELDS
+        rows = (
+            self.db.session.query(*model_columns(Delivery), *model_columns(Provider))
+            .outerjoin(Provider, Provider.id == Delivery.provider_id)
+            .filter(Delivery.id.in_(self._latest_ids(Delivery, purchase_ids)))
+            .all()
+        )
+        deliveries = []
+        for row in rows:
+            delivery = dict(zip(delivery_fields, row[:len(delivery_fields)]))
+            provider = dict(zip(Provider.API_FIELDS, row[len(delivery_fields):]))
+            delivery['provider'] = provider if provider['id'] is not None else None
+            deliveries.append(delivery)
+        return deliveries
+
+
+# ============ Benchmark ============
+
+def _per_order_chain(views, purchase_ids):
+    """Las consultas que hacían /purchases/<id>, /payments/<id>, /deliveries/<id>,
+    /delivery-providers y catalog /catalog/<id> (cada petición con su propia sesión)"""
+    Purchase, Payment, Delivery = views.Purchase, views.Payment, views.Delivery
+    session = views.db.session
+    for purchase_id in purchase_ids:
+        purchase = Purchase.query.get(purchase_id)
+        session.expire_all()
+        Payment.query.filter_by(purchase_id=purchase_id).order_by(Payment.id.desc()).first()
+        Purchase.query.get(purchase_id)
+        session.expire_all()
+        Delivery.query.filter_by(purchase_id=purchase_id).order_by(Delivery.id.desc()).first()
+        Purchase.query.get(purchase_id)
+        session.expire_all()
+        views.DeliveryProvider.query.all()
+        views.Book.query.get(purchase.book_id)
+        session.expire_all()
+
+
+def _measure(db, func):
+    """(consultas SQL, ms) de `func`, con la identidad de la sesión vacía"""
+    db.session.expire_all()
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    return len(statements), elapsed * 1000
+
+
+def register_commands(app, db, views):
+    @app.cli.command('bench-orders')
+    @click.option('--orders', 'count', default=200, help='Pedidos sintéticos (con pago y entrega)')
+    @click.option('--page', default=20, help='Pedidos por página')
+    @click.option('--user-id', default=-1, help='Usuario ficticio para los pedidos de prueba')
+    def bench_orders_command(count, page, user_id):
+        """Consultas SQL y ms por página: cadena por pedido frente a la vista agregada (se revierte)"""
+        Purchase, Payment, Delivery = views.Purchase, views.Payment, views.Delivery
+        try:
+            book = views.Book(title='Bench', author='Bench', price=10.0, stock=0, seller_id=user_id)
+            provider = views.DeliveryProvider(name='Bench', coverage_area='Bench', cost=1.0)
+            db.session.add_all([book, provider])
+            db.session.flush()
+            purchases = [
+                Purchase(user_id=user_id, book_id=book.id, quantity=1, total_price=10.0, status='Shipped')
+                for _ in range(count)
+            ]
+            db.session.add_all(purchases)
+            db.session.flush()
+            db.session.add_all(
+                [Payment(purchase_id=p.id, amount=10.0, payment_method='card', payment_status='Completed')
+                 for p in purchases]
+                + [Delivery(purchase_id=p.id, provider_id=provider.id, address='Bench',
+                            delivery_status='In Transit') for p in purchases]
+            )
+            db.session.flush()
+
+            ids = sorted((p.id for p in purchases), reverse=True)[:page]
+            chain = _measure(db, lambda: _per_order_chain(views, ids))
+            aggregated = _measure(db, lambda: views.load([Purchase.user_id == user_id], limit=page))
+            for label, (statements, ms) in (('per-order chain', chain), ('order views', aggregated)):
+                print(f"{label:<16} {statements:4d} SQL statements {ms:8.2f} ms per page of {len(ids)}")
+        finally:
+            db.session.rollback()
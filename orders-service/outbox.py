@@ -0,0 +1,92 @@
+# Relay del outbox de libros hacia la proyección de catalog-service:
+#   flask outbox-relay           bucle continuo (un único proceso por despliegue)
+#   flask outbox-relay --once    publica lo pendiente y termina
+import time
+from datetime import datetime, timedelta
+
+import click
+
+
+def relay_batch(db, BookOutbox, catalog_client, api_key, batch_size=500):
+    """Publicar el siguiente lote de eventos en orden; devuelve cuántos se publicaron.
+
+    Las filas se bloquean (FOR UPDATE) mientras se envían, así que dos
+    relays concurrentes se serializan y el orden de versiones se mantiene.
+    """
+    events = (
+        BookOutbox.query
+        .filter(BookOutbox.published_at.is_(None))
+        .order_by(BookOutbox.id)
+        .limit(batch_size)
+        .with_for_update()
+        .all()
+    )
+    if not events:
+        db.session.rollback()
+        return 0
+
+    try:
+        response = catalog_client.post(
+            '/internal/books/sync',
+            json={'events': [event.to_event() for event in events]},
+            headers={'X-Internal-Key': api_key}
+        )
+    except Exception:
+        db.session.rollback()
+        raise
+    if response.status_code != 200:
+        db.session.rollback()
+        raise RuntimeError(f'catalog sync failed with status {response.status_code}')
+
+    now = datetime.utcnow()
+    for event in events:
+        event.published_at = now
+    db.session.commit()
+    return len(events)
+
+
+def purge_published(db, BookOutbox, retention_hours):
+    cutoff = datetime.utcnow() - timedelta(hours=retention_hours)
+    deleted = BookOutbox.query.filter(BookOutbox.published_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def outbox_stats(db, BookOutbox):
+    """Pendientes y retraso de replicación (antigüedad del evento más viejo sin publicar)"""
+    pending, oldest = db.session.query(
+        db.func.count(BookOutbox.id),
+        db.func.min(BookOutbox.created_at)
+    ).filter(BookOutbox.published_at.is_(None)).one()
+    lag = (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0
+    return {'pending': pending, 'lag_seconds': round(max(lag, 0.0), 3)}
+
+
+def register_commands(app, db, BookOutbox, catalog_client, api_key):
+    @app.cli.command('outbox-relay')
+    @click.option('--once', is_flag=True, help='Publicar lo pendiente y terminar')
+    @click.option('--batch-size', default=500)
+    @click.option('--interval', default=0.5, help='Espera (s) cuando no hay eventos')
+    @click.option('--retention-hours', default=24, help='Conservar eventos publicados')
+    def outbox_relay_command(once, batch_size, interval, retention_hours):
+        """Proyectar los cambios de libros en catalog-service"""
+        last_purge = 0.0
+        while True:
+            try:
+                published = relay_batch(db, BookOutbox, catalog_client, api_key, batch_size)
+            except Exception as e:
+                print(f"Error relaying outbox: {e}")
+                if once:
+                    raise SystemExit(1)
+                time.sleep(interval * 4)
+                continue
+
+            if published:
+                print(f"✅ Relayed {published} book events")
+                continue
+            if once:
+                break
+            if time.monotonic() - last_purge > 3600:
+                purge_published(db, BookOutbox, retention_hours)
+                last_purge = time.monotonic()
+            time.sleep(interval)
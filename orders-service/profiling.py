@@ -0,0 +1,247 @@
+# Perfilado por petición (opt-in) y registro de peticiones y consultas lentas.
+#   cabecera `X-Profile: <PROFILE_TOKEN>`   perfila esa petición
+#   PROFILE_SAMPLE_RATE=0.01                perfila una de cada cien
+# El desglose (SQL, ORM, HTTP saliente, serialización) se devuelve en la
+# cabecera Server-Timing y se escribe como una línea JSON en el log, igual
+# que las peticiones y consultas que superan SLOW_REQUEST_MS / SLOW_QUERY_MS.
+import cProfile
+import contextlib
+import io
+import json
+import os
+import pstats
+import random
+import time
+from contextvars import ContextVar
+from datetime import datetime
+
+import click
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+MAX_STATEMENTS = 50
+MAX_STATEMENT_LENGTH = 500
+TOP_FUNCTIONS = 15
+ORM_PATH = os.path.join('sqlalchemy', 'orm')
+
+
+class Settings:
+    enabled = os.getenv('PROFILING', '1') == '1'
+    token = os.getenv('PROFILE_TOKEN', '')
+    sample_rate = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+    slow_request_ms = float(os.getenv('SLOW_REQUEST_MS', '500'))
+    slow_query_ms = float(os.getenv('SLOW_QUERY_MS', '200'))
+
+
+_current = ContextVar('request_trace', default=None)
+
+
+class RequestTrace:
+    """Tiempos de una petición; el detalle solo se guarda si está perfilada"""
+
+    __slots__ = ('start', 'sql', 'queries', 'http', 'serialization', 'statements', 'calls', 'profiler')
+
+    def __init__(self, profiled):
+        self.start = time.perf_counter()
+        self.sql = 0.0
+        self.queries = 0
+        self.http = 0.0
+        self.serialization = 0.0
+        self.statements = [] if profiled else None
+        self.calls = [] if profiled else None
+        self.profiler = cProfile.Profile() if profiled else None
+
+    def breakdown(self, total, orm=None):
+        """Milisegundos por categoría; `app` es el resto (código propio y ORM si no se perfiló)"""
+        parts = {'sql': self.sql, 'http': self.http, 'serialization': self.serialization}
+        if orm is not None:
+            parts['orm'] = orm
+        parts['app'] = max(total - sum(parts.values()), 0.0)
+        parts['total'] = total
+        return {name: round(seconds * 1000, 3) for name, seconds in parts.items()}
+
+
+def log_event(kind, **fields):
+    """Una línea JSON por evento (la recoge el log del contenedor)"""
+    print(json.dumps(dict(log=kind, ts=datetime.utcnow().isoformat(), **fields), default=str), flush=True)
+
+
+def _route():
+    if not has_request_context():
+        return None
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+# ============ SQL ============
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._profiling_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_profiling_start', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    trace = _current.get()
+    if trace is not None:
+        trace.sql += elapsed
+        trace.queries += 1
+        if trace.statements is not None and len(trace.statements) < MAX_STATEMENTS:
+            trace.statements.append({'ms': round(elapsed * 1000, 3), 'sql': statement[:MAX_STATEMENT_LENGTH]})
+    if elapsed * 1000 >= Settings.slow_query_ms:
+        log_event('slow_query', ms=round(elapsed * 1000, 3), route=_route(), sql=statement[:2000])
+
+
+# ============ HTTP saliente y serialización ============
+
+def _wrap_observer(client):
+    previous = client.observer
+
+    def observer(name, method, outcome, seconds):
+        if previous:
+            previous(name, method, outcome, seconds)
+        trace = _current.get()
+        if trace is not None:
+            trace.http += seconds
+            if trace.calls is not None:
+                trace.calls.append({'upstream': name, 'method': method, 'outcome': outcome,
+                                    'ms': round(seconds * 1000, 3)})
+
+    client.observer = observer
+
+
+def _wrap_json_provider(app):
+    # FastJSONProvider.dumps delega en dumps_bytes: basta con medir este
+    provider = app.json
+    name = 'dumps_bytes' if hasattr(provider, 'dumps_bytes') else 'dumps'
+    dumps = getattr(provider, name)
+
+    def timed_dumps(obj, **kwargs):
+        trace = _current.get()
+        if trace is None:
+            return dumps(obj, **kwargs)
+        started = time.perf_counter()
+        try:
+            return dumps(obj, **kwargs)
+        finally:
+            trace.serialization += time.perf_counter() - started
+
+    setattr(provider, name, timed_dumps)
+
+
+# ============ Hooks de Flask ============
+
+def _wants_profile():
+    token = Settings.token
+    if token and request.headers.get('X-Profile') == token:
+        return True
+    return Settings.sample_rate > 0 and random.random() < Settings.sample_rate
+
+
+def _before_request():
+    if not Settings.enabled:
+        return
+    trace = RequestTrace(_wants_profile())
+    g.profiling_token = _current.set(trace)
+    if trace.profiler is not None:
+        trace.profiler.enable()
+
+
+def _profile_summary(profiler):
+    """Tiempo propio en sqlalchemy.orm (carga de objetos) y funciones más costosas"""
+    stats = pstats.Stats(profiler).stats
+    orm = sum(tt for (filename, _, _), (_, _, tt, _, _) in stats.items() if ORM_PATH in filename)
+    top = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+    return orm, [
+        {'function': f'{os.path.basename(filename)}:{line}({name})', 'calls': nc, 'cumulative_ms': round(ct * 1000, 3)}
+        for (filename, line, name), (_, nc, _, ct, _) in top
+    ]
+
+
+def _after_request(response):
+    trace = _current.get()
+    if trace is None:
+        return response
+    total = time.perf_counter() - trace.start
+
+    if trace.profiler is not None:
+        trace.profiler.disable()
+        orm, top = _profile_summary(trace.profiler)
+        trace.profiler = None
+        breakdown = trace.breakdown(total, orm)
+        response.headers['Server-Timing'] = ', '.join(f'{name};dur={ms}' for name, ms in breakdown.items())
+        log_event(
+            'profile', method=request.method, route=_route(), path=request.path,
+            status=response.status_code, queries=trace.queries, breakdown_ms=breakdown,
+            statements=trace.statements, upstream=trace.calls, top_functions=top
+        )
+    elif total * 1000 >= Settings.slow_request_ms:
+        log_event(
+            'slow_request', method=request.method, route=_route(), path=request.path,
+            status=response.status_code, queries=trace.queries, breakdown_ms=trace.breakdown(total)
+        )
+    return response
+
+
+def _teardown_request(exc):
+    token = g.pop('profiling_token', None)
+    if token is None:
+        return
+    trace = _current.get()
+    if trace is not None and trace.profiler is not None:
+        # Excepción no controlada antes de after_request
+        trace.profiler.disable()
+    _current.reset(token)
+
+
+def init_app(app, clients=()):
+    """Instalar los hooks; llamar después de metrics.init_app y de fijar app.json"""
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    _wrap_json_provider(app)
+    for client in clients:
+        _wrap_observer(client)
+
+
+# ============ Benchmark ============
+
+def _requests_per_second(client, path, count):
+    started = time.perf_counter()
+    for _ in range(count):
+        client.get(path)
+    return count / (time.perf_counter() - started)
+
+
+def register_commands(app):
+    @app.cli.command('bench-profiling')
+    @click.option('--requests', 'count', default=5000, help='Peticiones por escenario')
+    @click.option('--path', default='/health/live', help='Endpoint a medir')
+    def bench_profiling_command(count, path):
+        """Coste por petición de los hooks de perfilado (desactivado, inactivo y perfilando)"""
+        client = app.test_client()
+        saved = (Settings.enabled, Settings.sample_rate, Settings.slow_request_ms)
+        Settings.slow_request_ms = float('inf')
+        try:
+            client.get(path)
+            results = {}
+            for label, enabled, rate in (('disabled', False, 0.0), ('idle', True, 0.0), ('profiled', True, 1.0)):
+                Settings.enabled, Settings.sample_rate = enabled, rate
+                # Los perfiles de cada petición no interesan aquí
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results[label] = _requests_per_second(client, path, count)
+        finally:
+            Settings.enabled, Settings.sample_rate, Settings.slow_request_ms = saved
+
+        baseline_us = 1e6 / results['disabled']
+        for label, rps in results.items():
+            overhead = 1e6 / rps - baseline_us
+            print(f"{label}: {rps:.0f} req/s ({overhead:+.1f} µs/req vs disabled)")
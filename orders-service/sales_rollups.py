@@ -0,0 +1,286 @@
+# Agregados diarios de ventas por vendedor y por libro, mantenidos de forma
+# incremental en la misma transacción que cambia la compra:
+#   compra creada   → orders, units, gross           (create_purchase, checkout)
+#   pago completado → paid_orders, paid_units, revenue (process_payment)
+#   envío realizado → shipped_orders                  (process_delivery)
+# El día es el de la compra (purchases.created_at), así que las tres cifras
+# de una fila describen los mismos pedidos. Los paneles leen estas filas en
+# vez de recorrer purchases.
+#   flask sales-backfill [--since 2024-01-01]   recalcula los agregados desde el historial
+#   flask bench-sales                           panel desde purchases frente a los agregados
+import random
+import time
+from datetime import date, datetime, timedelta
+
+import click
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from json_provider import model_columns, rows_to_dicts
+
+# Evento → columnas (pedidos, unidades, importe) que incrementa; None si no aplica
+EVENTS = {
+    'placed': ('orders', 'units', 'gross'),
+    'paid': ('paid_orders', 'paid_units', 'revenue'),
+    'shipped': ('shipped_orders', None, None),
+}
+METRICS = ('orders', 'units', 'gross', 'paid_orders', 'paid_units', 'revenue', 'shipped_orders')
+AMOUNTS = ('gross', 'revenue')
+
+# Estados de una compra que ya pasó por cada evento (para el backfill)
+PAID_STATUSES = ('Paid', 'Preparing Shipment', 'Shipped')
+SHIPPED_STATUSES = ('Shipped',)
+
+BACKFILL_BATCH_SIZE = 5000
+
+# Motores con INSERT ... ON CONFLICT (MySQL usa ON DUPLICATE KEY UPDATE)
+_CONFLICT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def _as_date(value):
+    # DATE() devuelve una cadena en SQLite y un date en MySQL
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+class SalesRollups:
+    def __init__(self, db, Purchase, Book, SellerDailySales, BookDailySales):
+        self.db = db
+        self.Purchase = Purchase
+        self.Book = Book
+        self.SellerDailySales = SellerDailySales
+        self.BookDailySales = BookDailySales
+
+    # ============ Escritura ============
+
+    def _grouped(self, criteria):
+        """(seller_id, book_id, día, pedidos, unidades, importe) de las compras que cumplen `criteria`"""
+        Purchase, Book, func = self.Purchase, self.Book, self.db.func
+        day = func.date(Purchase.created_at)
+        return (
+            self.db.session.query(
+                Book.seller_id, Purchase.book_id, day,
+                func.count(Purchase.id), func.sum(Purchase.quantity), func.sum(Purchase.total_price)
+            )
+            .join(Book, Book.id == Purchase.book_id)
+            .filter(*criteria)
+            .group_by(Book.seller_id, Purchase.book_id, day)
+            .all()
+        )
+
+    def _upsert(self, model, keys, counters, rows):
+        """Sumar `counters` a las filas de `model` (claves `keys`), creándolas si no existen"""
+        table = model.__table__
+        # Mismo orden de bloqueo en todas las transacciones (evita interbloqueos en MySQL)
+        rows = sorted(rows, key=lambda row: tuple(row[k] for k in keys))
+        dialect = self.db.engine.dialect.name
+        if dialect == 'mysql':
+            stmt = mysql.insert(table).values(rows)
+            stmt = stmt.on_duplicate_key_update({c: table.c[c] + stmt.inserted[c] for c in counters})
+        else:
+            stmt = _CONFLICT_INSERTS.get(dialect, sqlite.insert)(table).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(keys), set_={c: table.c[c] + stmt.excluded[c] for c in counters}
+            )
+        self.db.session.execute(stmt)
+
+    def _apply(self, event, criteria):
+        orders_col, units_col, amount_col = EVENTS[event]
+        counters = [c for c in (orders_col, units_col, amount_col) if c]
+        books, sellers = [], {}
+        for seller_id, book_id, day, orders, units, amount in self._grouped(criteria):
+            values = {
+                column: value
+                for column, value in zip((orders_col, units_col, amount_col), (orders, units or 0, amount or 0.0))
+                if column
+            }
+            day = _as_date(day)
+            books.append(dict(book_id=book_id, day=day, seller_id=seller_id, **values))
+            totals = sellers.setdefault((seller_id, day), dict.fromkeys(counters, 0))
+            for c in counters:
+                totals[c] += values[c]
+        if not books:
+            return 0
+        self._upsert(self.BookDailySales, ('book_id', 'day'), counters, books)
+        self._upsert(self.SellerDailySales, ('seller_id', 'day'), counters,
+                     [dict(seller_id=s, day=d, **totals) for (s, d), totals in sellers.items()])
+        return len(books)
+
+    def record(self, event, purchase_ids):
+        """Sumar un evento de estas compras a los agregados (sin commit; las compras ya en la sesión)"""
+        if purchase_ids:
+            self.db.session.flush()
+            self._apply(event, [self.Purchase.id.in_(purchase_ids)])
+
+    def backfill(self, since=None, batch_size=BACKFILL_BATCH_SIZE):
+        """Recalcular los agregados desde `since` (todo el historial si es None) en una transacción.
+
+        Borra primero las filas del rango: los incrementos concurrentes esperan
+        al commit y se suman sobre los valores recalculados.
+        """
+        Purchase, db = self.Purchase, self.db
+        for model in (self.SellerDailySales, self.BookDailySales):
+            query = model.query
+            if since:
+                query = query.filter(model.day >= since)
+            query.delete(synchronize_session=False)
+
+        base = [Purchase.created_at >= datetime.combine(since, datetime.min.time())] if since else []
+        min_id, max_id = db.session.query(db.func.min(Purchase.id), db.func.max(Purchase.id)).filter(*base).one()
+        rows = 0
+        # Por rangos de id para acotar la memoria con historiales grandes
+        for low in range((min_id or 1) - 1, max_id or 0, batch_size):
+            chunk = base + [Purchase.id > low, Purchase.id <= low + batch_size]
+            rows += self._apply('placed', chunk)
+            self._apply('paid', chunk + [Purchase.status.in_(PAID_STATUSES)])
+            self._apply('shipped', chunk + [Purchase.status.in_(SHIPPED_STATUSES)])
+        db.session.commit()
+        return rows
+
+    # ============ Lectura (paneles) ============
+
+    def seller_days(self, seller_id, start, end):
+        """Filas diarias del vendedor entre `start` y `end` (incluidos)"""
+        Daily = self.SellerDailySales
+        rows = (
+            self.db.session.query(*model_columns(Daily))
+            .filter(Daily.seller_id == seller_id, Daily.day.between(start, end))
+            .order_by(Daily.day)
+            .all()
+        )
+        return rows_to_dicts(Daily.API_FIELDS, rows)
+
+    def book_totals(self, seller_id, start, end, limit):
+        """Totales por libro en el rango, de más a menos ingresos"""
+        Daily, Book, func = self.BookDailySales, self.Book, self.db.func
+        sums = [func.sum(getattr(Daily, name)) for name in METRICS]
+        rows = (
+            self.db.session.query(Daily.book_id, Book.title, *sums)
+            .outerjoin(Book, Book.id == Daily.book_id)
+            .filter(Daily.seller_id == seller_id, Daily.day.between(start, end))
+            .group_by(Daily.book_id, Book.title)
+            .order_by(sums[METRICS.index('revenue')].desc(), Daily.book_id)
+            .limit(limit)
+            .all()
+        )
+        # MySQL devuelve SUM() como Decimal
+        return [
+            dict(book_id=book_id, title=title, **{
+                name: round(float(value or 0), 2) if name in AMOUNTS else int(value or 0)
+                for name, value in zip(METRICS, totals)
+            })
+            for book_id, title, *totals in rows
+        ]
+
+    def low_stock(self, seller_id, threshold, days, today):
+        """Libros del vendedor con stock <= `threshold` y unidades pagadas en los últimos `days` días"""
+        Daily, Book, func = self.BookDailySales, self.Book, self.db.func
+        recent = (
+            self.db.select(Daily.book_id, func.sum(Daily.paid_units).label('sold'))
+            .where(Daily.seller_id == seller_id, Daily.day > today - timedelta(days=days))
+            .group_by(Daily.book_id)
+            .subquery()
+        )
+        rows = (
+            self.db.session.query(Book.id, Book.title, Book.stock, func.coalesce(recent.c.sold, 0))
+            .outerjoin(recent, recent.c.book_id == Book.id)
+            .filter(Book.seller_id == seller_id, Book.stock <= threshold)
+            .order_by(Book.stock, Book.id)
+            .all()
+        )
+        books = []
+        for book_id, title, stock, sold in rows:
+            per_day = int(sold) / days
+            books.append({
+                'book_id': book_id,
+                'title': title,
+                'stock': stock,
+                'units_sold': int(sold),
+                # Días que dura el stock al ritmo de venta reciente (None si no se vende)
+                'days_of_cover': round(stock / per_day, 1) if per_day else None
+            })
+        return books
+
+
+def sum_metrics(rows):
+    """Suma de las métricas de unas filas ya leídas"""
+    result = {name: sum(row[name] for row in rows) for name in METRICS}
+    for name in AMOUNTS:
+        result[name] = round(result[name], 2)
+    return result
+
+
+# ============ Benchmark ============
+
+def _live_dashboard(rollups, seller_id, start):
+    """Lo que costaría el panel sin agregados: agrupar todas las compras del vendedor"""
+    Purchase, Book, db = rollups.Purchase, rollups.Book, rollups.db
+    day = db.func.date(Purchase.created_at)
+    return (
+        db.session.query(day, db.func.count(Purchase.id), db.func.sum(Purchase.quantity),
+                         db.func.sum(Purchase.total_price))
+        .join(Book, Book.id == Purchase.book_id)
+        .filter(Book.seller_id == seller_id, Purchase.created_at >= start)
+        .group_by(day)
+        .all()
+    )
+
+
+def _timed(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def register_commands(app, db, rollups):
+    @app.cli.command('sales-backfill')
+    @click.option('--since', default=None, help='Recalcular desde este día (YYYY-MM-DD); por defecto todo')
+    @click.option('--batch-size', default=BACKFILL_BATCH_SIZE, help='Compras por consulta')
+    def sales_backfill_command(since, batch_size):
+        """Recalcular los agregados de ventas desde purchases"""
+        since = date.fromisoformat(since) if since else None
+        started = time.perf_counter()
+        rows = rollups.backfill(since, batch_size)
+        print(f"✅ Sales rollups rebuilt ({rows} book-day rows) in {time.perf_counter() - started:.1f}s")
+
+    @app.cli.command('bench-sales')
+    @click.option('--purchases', 'count', default=20000, help='Compras sintéticas del vendedor')
+    @click.option('--books', default=50, help='Libros del vendedor')
+    @click.option('--days', default=90, help='Días de historial')
+    @click.option('--seller-id', default=-1, help='Vendedor ficticio para los datos de prueba')
+    @click.option('--repeat', default=20, help='Repeticiones de cada consulta')
+    def bench_sales_command(count, books, days, seller_id, repeat):
+        """ms del panel de 30 días: agrupando purchases frente a leer los agregados (se revierte)"""
+        Purchase, Book = rollups.Purchase, rollups.Book
+        rng = random.Random(0)
+        now = datetime.utcnow()
+        try:
+            catalog = [Book(title=f'Bench {i}', author='Bench', price=10.0, stock=rng.randrange(10),
+                            seller_id=seller_id) for i in range(books)]
+            db.session.add_all(catalog)
+            db.session.flush()
+            db.session.bulk_insert_mappings(Purchase, [
+                dict(user_id=seller_id, book_id=rng.choice(catalog).id, quantity=1, total_price=10.0,
+                     status='Paid', created_at=now - timedelta(minutes=rng.randrange(days * 24 * 60)))
+                for _ in range(count)
+            ])
+            ids = [i for (i,) in db.session.query(Purchase.id).filter(Purchase.user_id == seller_id)]
+
+            started = time.perf_counter()
+            for purchase_id in ids[:200]:
+                rollups.record('placed', [purchase_id])
+            per_purchase = (time.perf_counter() - started) / min(len(ids), 200) * 1000
+            rollups._apply('placed', [Purchase.id.in_(ids[200:])])
+            rollups._apply('paid', [Purchase.id.in_(ids)])
+
+            end = now.date()
+            start = end - timedelta(days=29)
+            live = _timed(lambda: _live_dashboard(rollups, seller_id, start), repeat)
+            daily = _timed(lambda: rollups.seller_days(seller_id, start, end), repeat)
+            low = _timed(lambda: rollups.low_stock(seller_id, 5, 30, end), repeat)
+            print(f"{'record (per purchase)':<24} {per_purchase:8.3f} ms")
+            print(f"{'dashboard from purchases':<24} {live:8.3f} ms ({count} purchases)")
+            print(f"{'dashboard from rollups':<24} {daily:8.3f} ms "
+                  f"({len(rollups.seller_days(seller_id, start, end))} rows)")
+            print(f"{'low stock from rollups':<24} {low:8.3f} ms")
+        finally:
+            db.session.rollback()
@@ -0,0 +1,146 @@
+# Agrupación de llamadas concurrentes idénticas (single-flight): mientras una
+# consulta a otro servicio o a la base de datos está en curso, las peticiones
+# que piden lo mismo esperan su resultado en vez de repetirla. No es una
+# caché: en cuanto la llamada termina, la siguiente vuelve a ejecutarse.
+#   flask bench-single-flight --threads 64 --hot-ratio 0.9   llamadas ahorradas
+import random
+import threading
+import time
+
+import click
+
+
+class SingleFlightTimeout(TimeoutError):
+    """La llamada compartida no terminó dentro del tiempo de espera"""
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name, timeout=5.0):
+        self.name = name
+        self.timeout = timeout
+        self.calls = 0
+        self.shared = 0
+        self.timeouts = 0
+        self.errors = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """Ejecutar `func` o esperar (como mucho `timeout`) a la que ya está en curso
+        con la misma clave; sus excepciones se propagan a todos los que esperan"""
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.calls += 1
+            else:
+                call.waiters += 1
+                self.shared += 1
+
+        if not leader:
+            if not call.done.wait(self.timeout):
+                with self._lock:
+                    self.timeouts += 1
+                raise SingleFlightTimeout(f'{self.name}: waited more than {self.timeout}s for {key!r}')
+            if isinstance(call.error, Exception):
+                raise call.error
+            if call.error is not None:
+                # El líder murió (SystemExit, gevent.Timeout...): para los que
+                # esperan equivale a no haber obtenido respuesta a tiempo
+                raise SingleFlightTimeout(f'{self.name}: shared call for {key!r} aborted')
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            # También SystemExit o gevent.Timeout: los que esperan no deben
+            # recibir un None como si fuera un resultado
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            requests = self.calls + self.shared
+            return {
+                'calls': self.calls,
+                'shared': self.shared,
+                'saved_ratio': round(self.shared / requests, 4) if requests else 0.0,
+                'timeouts': self.timeouts,
+                'errors': self.errors,
+                'in_flight': len(self._inflight)
+            }
+
+
+# ============ Benchmark ============
+
+def _hot_key_load(lookup, threads, requests, keys, hot_ratio):
+    """`threads` hilos piden `requests` claves en total; `hot_ratio` de ellas es la clave 0"""
+    latencies = []
+    lock = threading.Lock()
+    remaining = iter(range(requests))
+
+    def worker():
+        rng = random.Random()
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            key = 0 if rng.random() < hot_ratio else rng.randrange(1, keys)
+            started = time.perf_counter()
+            lookup(key)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    latencies.sort()
+    return time.perf_counter() - started, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99) - 1]
+
+
+def register_commands(app):
+    @app.cli.command('bench-single-flight')
+    @click.option('--threads', default=64, help='Peticiones concurrentes')
+    @click.option('--requests', 'count', default=2000, help='Consultas en total')
+    @click.option('--keys', default=100, help='Claves distintas (libros, tokens)')
+    @click.option('--hot-ratio', default=0.9, help='Fracción de consultas a la clave caliente')
+    @click.option('--latency-ms', default=20.0, help='Latencia simulada de cada llamada remota')
+    def bench_single_flight_command(threads, count, keys, hot_ratio, latency_ms):
+        """Llamadas remotas y latencia con y sin agrupación, con una clave caliente"""
+        for label, coalesce in (('direct', False), ('single-flight', True)):
+            upstream_calls = []
+            flight = SingleFlight('bench')
+
+            def upstream(key):
+                upstream_calls.append(key)
+                time.sleep(latency_ms / 1000)
+                return key
+
+            def lookup(key):
+                return flight.do(key, lambda: upstream(key)) if coalesce else upstream(key)
+
+            elapsed, p50, p99 = _hot_key_load(lookup, threads, count, max(keys, 2), hot_ratio)
+            print(f"{label:<14} {len(upstream_calls):6d} upstream calls for {count} lookups "
+                  f"{count / elapsed:8.0f} lookups/s  p50 {p50 * 1000:6.1f} ms  p99 {p99 * 1000:6.1f} ms")
@@ -0,0 +1,159 @@
+# Prueba local de la proyección de libros (outbox de orders-service ->
+# catalog-service): arranca auth, orders y catalog con el servidor de
+# desarrollo, cada uno sobre su propia base SQLite, crea, modifica y borra un
+# libro en orders-service y tras cada paso ejecuta `flask outbox-relay --once`
+# y comprueba la copia de catalog-service.
+#   python scripts/outbox_harness.py          termina con estado 1 si algo falla
+#   python scripts/outbox_harness.py --keep   conserva las bases y los logs
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICES = ('auth', 'catalog', 'orders')
+DEV_SERVER = ('from app import create_app; '
+              'create_app().run(host="127.0.0.1", port={port}, use_reloader=False)')
+ADMIN = {'name': 'Harness', 'email': 'harness@example.com', 'password': 'harness-password', 'is_admin': True}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _service_dir(name):
+    return os.path.join(ROOT, f'{name}-service')
+
+
+def _call(port, method, path, body=None, token=None):
+    """(status, JSON) de una petición al servicio local"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    try:
+        conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = conn.getresponse()
+        data = response.read()
+        return response.status, json.loads(data) if data else None
+    finally:
+        conn.close()
+
+
+def _flask(name, env, *args):
+    result = subprocess.run([sys.executable, '-m', 'flask', *args], cwd=_service_dir(name),
+                            env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise click.ClickException(f'{name}: flask {" ".join(args)} failed:\n{result.stdout}{result.stderr}')
+    return result.stdout
+
+
+def _start(name, env, port, log_path, timeout=30):
+    """Arrancar el servicio y esperar a que /health/live responda"""
+    log = open(log_path, 'w')
+    process = subprocess.Popen([sys.executable, '-c', DEV_SERVER.format(port=port)],
+                               cwd=_service_dir(name), env=env, stdout=log, stderr=subprocess.STDOUT)
+    log.close()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise click.ClickException(f'{name} exited with status {process.returncode} (see {log_path})')
+        try:
+            if _call(port, 'GET', '/health/live')[0] == 200:
+                return process
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise click.ClickException(f'{name} did not answer /health/live on port {port} in {timeout}s')
+
+
+def _check(label, ok, detail=''):
+    print(f"{'✅' if ok else '❌'} {label}{f': {detail}' if detail else ''}")
+    return ok
+
+
+@click.command()
+@click.option('--keep', is_flag=True, help='Conservar las bases SQLite y los logs de los servicios')
+def main(keep):
+    """Crear, modificar y borrar un libro en orders-service y comprobar la proyección en catalog-service"""
+    workdir = tempfile.mkdtemp(prefix='bookstore-outbox-')
+    ports = {name: _free_port() for name in SERVICES}
+    base = dict(os.environ, FLASK_APP='app', FLASK_CONFIG='development',
+                AUTH_SERVICE_URL=f'http://127.0.0.1:{ports["auth"]}',
+                CATALOG_SERVICE_URL=f'http://127.0.0.1:{ports["catalog"]}')
+    # Un solo proceso por servicio: sin Redis ni réplicas
+    for key in ('FLASK_RUN_FROM_CLI', 'SHARED_STORE_URL', 'DATABASE_REPLICA_URIS', 'GUNICORN_WORKERS'):
+        base.pop(key, None)
+    envs = {name: dict(base, DATABASE_URI=f'sqlite:///{os.path.join(workdir, name)}.db') for name in SERVICES}
+
+    processes = []
+    results = []
+    try:
+        for name in SERVICES:
+            _flask(name, envs[name], 'db-upgrade')
+            processes.append(_start(name, envs[name], ports[name], os.path.join(workdir, f'{name}.log')))
+
+        _call(ports['auth'], 'POST', '/register', ADMIN)
+        status, data = _call(ports['auth'], 'POST', '/login', {'email': ADMIN['email'], 'password': ADMIN['password']})
+        if status != 200:
+            raise click.ClickException(f'login failed with status {status}: {data}')
+        token = data['access_token']
+
+        def relay():
+            _flask('orders', envs['orders'], 'outbox-relay', '--once')
+
+        def catalog_book(book_id):
+            return _call(ports['catalog'], 'GET', f'/catalog/{book_id}')
+
+        status, data = _call(ports['orders'], 'POST', '/books',
+                             {'title': 'Harness', 'author': 'Outbox', 'price': 10.0, 'stock': 3}, token)
+        if status != 201:
+            raise click.ClickException(f'create_book failed with status {status}: {data}')
+        book_id = data['book']['id']
+        status, _ = catalog_book(book_id)
+        results.append(_check('not projected before the relay', status == 404, f'status {status}'))
+        relay()
+        status, data = catalog_book(book_id)
+        results.append(_check('create projected', status == 200 and data['book']['title'] == 'Harness',
+                              f'status {status}'))
+
+        _call(ports['orders'], 'PUT', f'/books/{book_id}', {'price': 12.5}, token)
+        relay()
+        status, data = catalog_book(book_id)
+        results.append(_check('update projected', status == 200 and data['book']['price'] == 12.5,
+                              f'price {data["book"]["price"] if status == 200 else None}'))
+
+        _call(ports['orders'], 'DELETE', f'/books/{book_id}', token=token)
+        relay()
+        status, _ = catalog_book(book_id)
+        results.append(_check('delete projected', status == 404, f'status {status}'))
+
+        _, outbox = _call(ports['orders'], 'GET', '/outbox/stats', token=token)
+        _, projection = _call(ports['catalog'], 'GET', '/projection/stats', token=token)
+        results.append(_check('outbox drained', outbox['outbox']['pending'] == 0, json.dumps(outbox)))
+        print(f"   projection: {json.dumps(projection)}")
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+        if keep:
+            print(f"Databases and logs kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if not all(results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()